@@ -1,10 +1,8 @@
-import jwt
-
-from django.conf import settings
-
 from rest_framework import authentication, exceptions
 
-from users.models import User
+from users.services import get_cached_user
+
+from .services import decode_token
 
 
 class JWTAuthentication(authentication.BaseAuthentication):
@@ -68,15 +66,14 @@ class JWTAuthentication(authentication.BaseAuthentication):
         """
 
         try:
-            payload = jwt.decode(
-                token, settings.SECRET_KEY, algorithms=["HS256"])
+            payload = decode_token(token)
         except:
             raise exceptions.AuthenticationFailed(
                 'Invalid authentication. Could not decode token.')
 
-        try:
-            user = User.objects.get(pk=payload['id'])
-        except User.DoesNotExist:
+        user = get_cached_user(payload['id'])
+
+        if user is None:
             raise exceptions.AuthenticationFailed(
                 'No user matching this token was found.')
 
@@ -1,6 +1,16 @@
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+
+from django.conf import settings
 from django.contrib.auth import authenticate
 from rest_framework.exceptions import AuthenticationFailed, PermissionDenied
 
+_tokens = OrderedDict()
+_tokens_lock = threading.Lock()
+
 
 def login(email: str, password: str):
     """
@@ -16,3 +26,32 @@ def login(email: str, password: str):
     user.token = user.generate_jwt_token()
 
     return user
+
+
+def decode_token(token):
+    """
+    Decode a JSON Web Token, reusing the payload if this process decoded the token before.
+
+    Payloads are kept until their token expires, for up to `JWT_CACHE_SIZE` recently used tokens.
+
+    :raises jwt.InvalidTokenError: If the token is invalid or expired.
+    """
+    with _tokens_lock:
+        payload = _tokens.get(token)
+
+        if payload and payload['exp'] > time.time():
+            _tokens.move_to_end(token)
+            return payload
+
+        _tokens.pop(token, None)
+
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=['HS256'])
+
+    if 'exp' in payload:
+        with _tokens_lock:
+            _tokens[token] = payload
+
+            while len(_tokens) > settings.JWT_CACHE_SIZE:
+                _tokens.popitem(last=False)
+
+    return payload
@@ -0,0 +1,65 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast
+from rest_framework.filters import SearchFilter
+
+from .utils.db import TrigramWordSimilar, TrigramWordSimilarity
+
+
+class RankedSearchFilter(SearchFilter):
+    """
+    Searches the `search_vector_field` of a view with a full-text query that matches the
+    prefixes of the search words, and its `search_trigram_field` by trigram word similarity,
+    so misspelt words still match. Both columns need a GIN index to be searched quickly.
+
+    Results are ordered by the sum of the full-text rank and the trigram similarity, then by id,
+    and are paged by that ordering by `base.pagination.KeysetPagination`.
+
+    Words match if their similarity is at least `SEARCH_WORD_SIMILARITY`. The trigram index is only
+    used if the queryset is read in the transaction it is filtered in. See `get_trigram_filter`.
+    """
+    search_config = 'english'
+
+    def get_search_words(self, request):
+        # Keep the words only, so the terms can be used in a raw query.
+        return [word for term in self.get_search_terms(request) for word in re.findall(r'\w+', term)]
+
+    def get_trigram_filter(self, queryset, field, text):
+        """
+        The `%>` operator, which the trigram index answers, compares the similarity to the
+        `pg_trgm.word_similarity_threshold` setting. The setting is set for the current transaction
+        only, because connections are shared. Outside of a transaction, the `trigram_similarity`
+        of the rows is compared to the threshold instead, which reads every row.
+        """
+        threshold = settings.SEARCH_WORD_SIMILARITY
+        connection = connections[queryset.db]
+
+        if connection.in_atomic_block:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)", [str(threshold)])
+
+            return Q(TrigramWordSimilar(F(field), text))
+
+        return Q(trigram_similarity__gte=threshold)
+
+    def filter_queryset(self, request, queryset, view):
+        words = self.get_search_words(request)
+
+        if not words:
+            return queryset
+
+        text = ' '.join(words)
+        query = SearchQuery(' & '.join(f'{word}:*' for word in words), config=self.search_config,
+                            search_type='raw')
+        queryset = queryset.alias(trigram_similarity=TrigramWordSimilarity(text, F(view.search_trigram_field)))
+        # The ranks are `real` numbers, which are cast to `double precision` so that the rank of the
+        # last row of a page is the same number in the cursor of the next page.
+        rank = Cast(SearchRank(F(view.search_vector_field), query) + F('trigram_similarity'), FloatField())
+
+        return queryset.annotate(search_rank=rank).filter(
+            Q(**{view.search_vector_field: query}) | self.get_trigram_filter(queryset, view.search_trigram_field, text)
+        ).order_by('-search_rank', '-id')
@@ -1,3 +1,39 @@
+import re
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import prefetch_related_objects
+from django.http import StreamingHttpResponse
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from rest_framework.utils.serializer_helpers import ReturnList
+
+from .pagination import KeysetPagination
+from .renderers import JSONRenderer, encode_json
+from .serializers import ValuesSerializer
+from .utils.db import plan_queryset
+
+
+_resource_names = {}
+
+
+def get_resource_name(view_class):
+    """
+    Get the name of the resource a viewset class serves, from the model of its queryset
+    or of its serializer. The name is resolved once per class.
+
+    :return: The model name, or None if the viewset has no model.
+    """
+    if view_class not in _resource_names:
+        queryset = getattr(view_class, 'queryset', None)
+        serializer_meta = getattr(getattr(view_class, 'serializer_class', None), 'Meta', None)
+        model = getattr(queryset, 'model', None) or getattr(serializer_meta, 'model', None)
+
+        _resource_names[view_class] = model.__name__ if model else None
+
+    return _resource_names[view_class]
+
+
 class SuccessMessageMixin:
     """
     Adds a resource name and success message to the renderer context to be used by
@@ -9,19 +45,188 @@ class SuccessMessageMixin:
     def get_renderer_context(self):
         context = super().get_renderer_context()
 
-        if not self.resource_name:
-            try:
-                self.resource_name = type(self.get_queryset()[0]).__name__ if hasattr(
-                    self, 'get_queryset') else None
-            except IndexError as e:
-                # If the queryset returns an empty list,
-                # set `success_message` to 'No records found.'
-                self.success_message = 'No records found.'
-            except:
-                # If an error is raised, fail silently and move on.
-                pass
-
-        context['resource_name'] = self.resource_name
+        context['resource_name'] = self.resource_name or get_resource_name(type(self))
         context['success_message'] = self.success_message
 
         return context
+
+
+class StreamingMixin:
+    """
+    Streams list responses in the envelope of `base.renderers.JSONRenderer` when the request has
+    a truthy `stream` query parameter.
+
+    Rows are read with a server-side cursor and serialized `STREAM_CHUNK_SIZE` rows at a time, so
+    the memory used by a request does not grow with the number of rows.
+    """
+
+    def should_stream(self):
+        return self.request.query_params.get('stream', '').lower() in ('1', 'true')
+
+    def get_streaming_response(self, queryset, serializer_class):
+        """
+        Stream `queryset` serialized with `serializer_class` as a chunked JSON array.
+
+        :param queryset: The rows to serialize.
+        :param serializer_class: The serializer of a single row.
+
+        :return: A `StreamingHttpResponse`.
+        """
+        renderer_context = {**self.get_renderer_context(), 'response': Response(status=200)}
+        serializer = serializer_class(context=self.get_serializer_context())
+        chunk_size = settings.STREAM_CHUNK_SIZE
+
+        def stream():
+            rows = queryset.iterator(chunk_size=chunk_size)
+            chunk = list(islice(rows, chunk_size))
+            # The message of the envelope depends on whether there are rows. The data is the last
+            # item of the envelope, so the rows are written between its brackets.
+            envelope = JSONRenderer().render(
+                ReturnList([None] if chunk else [], serializer=None), None, renderer_context)
+            start, end = envelope[:envelope.rindex(b'[') + 1], b']}'
+
+            yield start
+
+            if not chunk:
+                yield end
+                return
+
+            separator = b''
+
+            while chunk:
+                # `iterator()` ignores `prefetch_related()`, so the related objects of each chunk
+                # are prefetched together.
+                prefetch_related_objects(chunk, *queryset._prefetch_related_lookups)
+                data = separator + b','.join(encode_json(serializer.to_representation(row)) for row in chunk)
+                chunk = list(islice(rows, chunk_size))
+                separator = b','
+
+                yield data if chunk else data + end
+
+        return StreamingHttpResponse(stream(), content_type='application/json')
+
+
+class QueryPlanningMixin:
+    """
+    Plans the viewset queryset from the serializer of the viewset, so list responses make
+    the same number of queries whatever their length. See `base.utils.db.plan_queryset`.
+
+    Only the serialized columns are loaded for reads. Writes load every column, because
+    validation and saving can read fields the serializer does not return.
+    """
+
+    def get_queryset(self):
+        return plan_queryset(super().get_queryset(), self.get_serializer(),
+                             defer=self.request.method in SAFE_METHODS)
+
+
+class ValuesMixin:
+    """
+    Serializes list responses straight from `QuerySet.values()` rows when `read_from_values` is set,
+    instead of creating a model instance for each row. See `base.serializers.ValuesSerializer`.
+    """
+    read_from_values = False
+
+    def get_list_response(self, queryset, serializer, ordering=None):
+        """
+        Serialize the rows of `queryset`, or the requested page of them if the viewset is paginated.
+
+        :param queryset: The rows to serialize.
+        :param serializer: A serializer of a single row.
+        :param ordering: The ordering of the pages, if not the ordering of the paginator.
+
+        :return: A `Response`.
+        """
+        paginator = self.paginator
+
+        if paginator is not None:
+            queryset = paginator.get_page_queryset(queryset, self.request, ordering)
+
+        if not self.read_from_values:
+            rows = queryset if paginator is None else paginator.get_page(queryset)
+
+            return Response(type(serializer)(rows, many=True, context=serializer.context).data)
+
+        values_serializer = ValuesSerializer(serializer)
+
+        if paginator is not None:
+            values_serializer.paths.update(paginator.get_fields(paginator.ordering))
+
+        rows = values_serializer.get_rows(queryset)
+
+        if paginator is not None:
+            rows = paginator.get_page(rows, lambda row, fields: [row[name] for name in fields])
+
+        return Response(values_serializer.serialize_rows(rows))
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        return self.get_list_response(queryset, self.get_serializer())
+
+
+class KeysetPaginationMixin:
+    """
+    Pages list responses with `base.pagination.KeysetPagination`, and adds the link to the next
+    page to the renderer context.
+    """
+    pagination_class = KeysetPagination
+
+    def get_renderer_context(self):
+        context = super().get_renderer_context()
+
+        if self.paginator is not None:
+            context['next'] = self.paginator.get_next_link()
+
+        return context
+
+
+class FieldsetMixin:
+    """
+    Reads sparse fieldsets and included resource types from the query parameters into the
+    serializer context of read requests, for serializers that use `base.serializers.FieldsetMixin`.
+
+    `?fields[cycle]=id,cycle_number` only returns the `id` and `cycle_number` fields of cycles.
+    `?include=cycle,group,user` returns the ids of related cycles, groups and users in place of
+    the nested objects, and returns each of the objects once in the `included` item of the response.
+    """
+    fieldset_pattern = re.compile(r'^fields\[(\w+)\]$')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.included = {}
+
+    def get_fieldsets(self):
+        fieldsets = {}
+
+        for key, value in self.request.query_params.items():
+            match = self.fieldset_pattern.match(key)
+
+            if match:
+                fieldsets[match.group(1)] = set(filter(None, value.split(',')))
+
+        return fieldsets
+
+    def get_include(self):
+        return set(filter(None, self.request.query_params.get('include', '').split(',')))
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+
+        if hasattr(self, 'included') and self.request.method in SAFE_METHODS:
+            context.update(fields=self.get_fieldsets(), include=self.get_include(), included=self.included)
+
+        return context
+
+    def should_stream(self):
+        # Included objects are only known once every row is serialized.
+        return not self.get_include() and super().should_stream()
+
+    def get_renderer_context(self):
+        context = super().get_renderer_context()
+
+        if getattr(self, 'included', None):
+            context['included'] = {name: [value for id, value in sorted(objects.items())]
+                                   for name, objects in self.included.items()}
+
+        return context
@@ -0,0 +1,129 @@
+import base64
+import json
+
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db.models import F, Value
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .utils.db import RowComparison
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pages lists by the position of the last row of the previous page, so every page is read with
+    one range scan of an index on the ordering columns, however deep it is.
+
+    Lists are ordered by `ordering`, which ends with the primary key to break ties, or by their own
+    ordering if they were ordered with `order_by()`, e.g. by a search rank. The `cursor`
+    query parameter is the encoded position of the last row of the previous page. The link to the
+    next page is added to the renderer context by `base.mixins.KeysetPaginationMixin`, so the
+    data of the response stays a list.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.next_position = None
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_fields(self, ordering):
+        return [name.lstrip('-') for name in ordering]
+
+    def get_model_fields(self, queryset, ordering):
+        # Annotations, like search ranks, are typed by their output field.
+        return [queryset.query.annotations[name].output_field if name in queryset.query.annotations
+                else queryset.model._meta.get_field(name) for name in self.get_fields(ordering)]
+
+    def decode_cursor(self, request, model_fields):
+        cursor = request.query_params.get(self.cursor_query_param)
+
+        if not cursor:
+            return None
+
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+
+            if not isinstance(position, list) or len(position) != len(model_fields):
+                raise NotFound(self.invalid_cursor_message)
+
+            return [field.to_python(value) for field, value in zip(model_fields, position)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position):
+        position = [value.isoformat() if hasattr(value, 'isoformat') else value for value in position]
+
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def get_page_queryset(self, queryset, request, ordering=None):
+        """
+        Order `queryset` and limit it to the rows of the requested page, and one more row
+        to tell whether there is a next page. See `get_page`.
+
+        :param ordering: The ordering of the list, if the queryset is not ordered with `order_by()`
+                         and the list is not ordered by `ordering`.
+        """
+        self.request = request
+        self.ordering = ordering = ordering or queryset.query.order_by or self.ordering
+        self.page_size = self.get_page_size(request)
+
+        if len({name.startswith('-') for name in ordering}) > 1:
+            raise ImproperlyConfigured('Keyset pagination needs all the ordering fields in the same direction.')
+
+        queryset = queryset.order_by(*ordering)
+        model_fields = self.get_model_fields(queryset, ordering)
+        position = self.decode_cursor(request, model_fields)
+
+        if position is not None:
+            queryset = queryset.filter(RowComparison(
+                [F(name) for name in self.get_fields(ordering)], '<' if ordering[0].startswith('-') else '>',
+                [Value(value, output_field=field) for value, field in zip(position, model_fields)]))
+
+        return queryset[:self.page_size + 1]
+
+    def get_page(self, rows, get_position=None):
+        """
+        Drop the extra row read by `get_page_queryset`, and remember the position of the
+        last row of the page.
+
+        :param rows: The rows read from the page queryset.
+        :param get_position: Callable that is passed a row and a list of field names, and returns
+                             the values of the fields. Defaults to the attributes of model instances.
+
+        :return: The rows of the page.
+        """
+        rows = list(rows)
+        get_position = get_position or (lambda row, fields: [getattr(row, name) for name in fields])
+
+        if len(rows) > self.page_size:
+            rows = rows[:self.page_size]
+            self.next_position = get_position(rows[-1], self.get_fields(self.ordering))
+
+        return rows
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.get_page(self.get_page_queryset(queryset, request))
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param,
+                                   self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        return Response(data)
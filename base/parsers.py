@@ -0,0 +1,16 @@
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+import msgpack
+
+
+class MessagePackParser(BaseParser):
+    """
+    Parse request bodies sent in the MessagePack format.
+    """
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except ValueError as e:
+            raise ParseError(f'MessagePack parse error - {e}')
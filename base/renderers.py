@@ -1,17 +1,52 @@
+from djmoney.money import Money
 from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
 from rest_framework.utils.serializer_helpers import ReturnList
 import inflection
+import msgpack
+import orjson
+
+
+_encoder = JSONEncoder()
+
+
+def encode_default(obj):
+    """
+    Encode the values orjson does not support the way the REST framework JSON encoder does,
+    e.g. `Decimal`, lazy translation strings and query sets.
+    """
+    if isinstance(obj, Money):
+        return _encoder.default(obj.amount)
+
+    return _encoder.default(obj)
+
+
+def encode_json(data):
+    """
+    Encode `data` with orjson, producing the same JSON as the REST framework JSON renderer.
+    """
+    # Dates are passed to `encode_default` so they are formatted like the REST framework formats them.
+    content = orjson.dumps(data, default=encode_default,
+                           option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+
+    # Escape the line and paragraph separators like the REST framework does,
+    # because they are not valid in JavaScript strings.
+    return content.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
 
 
 class JSONRenderer(renderers.JSONRenderer):
-    def render(self, data, accepted_media_type=None, renderer_context=None):
+    def get_envelope(self, data, renderer_context):
+        """
+        Wrap the response data in the `success`, `message`, `errors` and `data` envelope.
+
+        :return: The envelope, or None if the response has no body.
+        """
         status = renderer_context.get('response').status_code
         success_message = renderer_context.get('success_message', None)
 
         # Return an empty body for responses with 204 status code.
         if status == 204:
-            return super(JSONRenderer, self).render(
-                None, accepted_media_type, renderer_context)
+            return None
 
         actions = {'GET': 'retrieved', 'POST': 'created', 'PUT': 'updated'}
 
@@ -23,6 +58,10 @@ class JSONRenderer(renderers.JSONRenderer):
         resource_name = inflection.pluralize(resource_name) if isinstance(
             data, ReturnList) else resource_name
 
+        # Tell clients when a list has no items.
+        if not success_message and isinstance(data, ReturnList) and not data:
+            success_message = 'No records found.'
+
         # Generate success message if a success message does not already exist,
         # and the actino and resource name exist.
         if not success_message and action and resource_name:
@@ -63,13 +102,42 @@ class JSONRenderer(renderers.JSONRenderer):
 
         # Construct the response data structure.
         raw_response_data = {'success': status < 400, 'message': message, 'errors': errors,
-                             'data': data, }
+                             'next': renderer_context.get('next'), 'data': data,
+                             'included': renderer_context.get('included')}
 
         # Remove response data items that have None value.
         response_data = {k: v for k,
                          v in raw_response_data.items() if v is not None}
 
-        response = super(JSONRenderer, self).render(
-            response_data, accepted_media_type, renderer_context)
+        return response_data
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response_data = self.get_envelope(data, renderer_context)
+
+        if response_data is None:
+            return b''
+
+        # orjson only indents with 2 spaces, so indented responses are encoded by the REST framework.
+        if self.get_indent(accepted_media_type or '', renderer_context):
+            return super(JSONRenderer, self).render(
+                response_data, accepted_media_type, renderer_context)
+
+        return encode_json(response_data)
+
+
+class MessagePackRenderer(JSONRenderer):
+    """
+    Render the same envelope as `JSONRenderer` in the MessagePack format, which is smaller
+    and faster to parse, for clients that send `Accept: application/msgpack`.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response_data = self.get_envelope(data, renderer_context)
+
+        if response_data is None:
+            return b''
 
-        return response
+        return msgpack.packb(response_data, default=encode_default)
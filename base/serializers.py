@@ -0,0 +1,226 @@
+import inflection
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.utils.serializer_helpers import ReturnList
+
+
+def get_resource_type(model):
+    """
+    Get the type used to name a model in `fields[...]` and `include` query parameters.
+    """
+    return model._meta.model_name
+
+
+class IncludedField(serializers.Field):
+    """
+    Represents a related object by its id, and serializes the object once
+    into the included objects of the response.
+    """
+
+    def __init__(self, serializer, **kwargs):
+        self.serializer = serializer
+        super().__init__(read_only=True, **kwargs)
+
+    def bind(self, field_name, parent):
+        super().bind(field_name, parent)
+        self.serializer.bind(field_name, self)
+
+    def to_representation(self, value):
+        included = self.context['included'].setdefault(
+            inflection.pluralize(get_resource_type(self.serializer.Meta.model)), {})
+
+        if value.pk not in included:
+            # Reserve the id first, so an object that refers back to itself is only serialized once.
+            included[value.pk] = None
+            included[value.pk] = self.serializer.to_representation(value)
+
+        return value.pk
+
+
+class FieldsetMixin:
+    """
+    Limits the fields of a model serializer to the sparse fieldset of its resource type,
+    and replaces nested serializers of the included resource types with an `IncludedField`.
+
+    The fieldsets and included types are read from the `fields` and `include` items of the
+    serializer context. See `base.mixins.FieldsetMixin`.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.context.get('fields', {}).get(get_resource_type(self.Meta.model))
+        include = self.context.get('include', ())
+
+        if fieldset is not None:
+            fields = {name: field for name, field in fields.items() if name in fieldset}
+
+        for name, field in fields.items():
+            if isinstance(field, FieldsetMixin) and get_resource_type(field.Meta.model) in include:
+                fields[name] = IncludedField(field, source=field.source)
+
+        return fields
+
+
+class ValuesSerializer():
+    """
+    Serializes querysets straight from `QuerySet.values()` rows, with the same output as
+    a model serializer, without creating model instances.
+
+    The field tree of the serializer is compiled once into the columns to read and a function
+    for each field that maps a row to the field representation. Many-to-many fields are read
+    with one more query for all the rows.
+
+    Method fields need a `<method name>_from_values` method on their serializer, which is passed
+    a dict of the columns of the serializer model, keyed by attribute name, and of the models in
+    the `select_related` tuple of the serializer `Meta`, keyed by `<relation>__<attribute name>`.
+
+    :raises ImproperlyConfigured: If the serializer has fields that cannot be read from values.
+    """
+
+    def __init__(self, serializer):
+        self.serializer = serializer
+        self.model = serializer.Meta.model
+        self.paths = set()
+        self.many_related = []
+        self.to_representation = self.compile(serializer, self.model, '')
+
+    def compile(self, serializer, model, prefix):
+        mappers = []
+        method_fields = False
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+
+            if isinstance(field, serializers.SerializerMethodField):
+                mappers.append((name, self.compile_method(serializer, field, prefix)))
+                method_fields = True
+                continue
+
+            included = isinstance(field, IncludedField)
+            field = field.serializer if included else field
+
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(
+                    f'{type(serializer).__name__}.{name} is not a field of {model.__name__}.')
+
+            path = prefix + field.source
+
+            if isinstance(field, serializers.ManyRelatedField):
+                mappers.append((name, self.compile_many_related(model_field, prefix, path)))
+            elif isinstance(field, serializers.ListSerializer):
+                raise ImproperlyConfigured(f'{type(serializer).__name__}.{name} is a nested list.')
+            elif isinstance(field, serializers.BaseSerializer):
+                self.paths.add(path)
+                nested = self.compile(field, model_field.related_model, path + '__')
+                mappers.append((name, self.compile_nested(
+                    path, nested, field if included else None)))
+            elif model_field.is_relation:
+                self.paths.add(path)
+                mappers.append((name, lambda row, path=path: row[path]))
+            else:
+                self.paths.add(path)
+                mappers.append((name, self.compile_field(path, field)))
+
+        if method_fields:
+            self.paths.update(prefix + model_field.attname for model_field in model._meta.concrete_fields)
+
+            for name in getattr(serializer.Meta, 'select_related', ()):
+                related_model = model._meta.get_field(name).related_model
+                self.paths.update(f'{prefix}{name}__{model_field.attname}'
+                                  for model_field in related_model._meta.concrete_fields)
+
+        def to_representation(row):
+            return {name: mapper(row) for name, mapper in mappers}
+
+        return to_representation
+
+    def compile_field(self, path, field):
+        def to_representation(row):
+            value = row[path]
+
+            return None if value is None else field.to_representation(value)
+
+        return to_representation
+
+    def compile_nested(self, path, nested, included_serializer):
+        if included_serializer is None:
+            return lambda row: None if row[path] is None else nested(row)
+
+        resource_type = inflection.pluralize(get_resource_type(included_serializer.Meta.model))
+
+        def to_representation(row):
+            pk = row[path]
+
+            if pk is not None:
+                included = self.serializer.context['included'].setdefault(resource_type, {})
+
+                if pk not in included:
+                    included[pk] = nested(row)
+
+            return pk
+
+        return to_representation
+
+    def compile_method(self, serializer, field, prefix):
+        method = getattr(serializer, f'{field.method_name}_from_values', None)
+
+        if method is None:
+            raise ImproperlyConfigured(
+                f'{type(serializer).__name__} has no {field.method_name}_from_values method.')
+
+        def to_representation(row):
+            return method({path[len(prefix):]: value for path, value in row.items()
+                           if path.startswith(prefix)})
+
+        return to_representation
+
+    def compile_many_related(self, model_field, prefix, path):
+        if model_field.many_to_many and model_field.concrete:
+            lookup = model_field.related_query_name()
+        elif model_field.one_to_many:
+            lookup = model_field.field.name
+        else:
+            raise ImproperlyConfigured(f'{path} is not a forward many-to-many or a reverse foreign key.')
+
+        pk_path = prefix + model_field.model._meta.pk.name
+        self.paths.add(pk_path)
+        self.many_related.append((path, model_field.related_model, lookup, pk_path))
+
+        return lambda row: row[f'{path}__pks']
+
+    def get_rows(self, queryset):
+        """
+        Read the values of `queryset` and the primary keys of many-to-many fields.
+
+        :return: List of rows, see `serialize_rows`.
+        """
+        rows = list(queryset.prefetch_related(None).values(*self.paths))
+
+        for path, related_model, lookup, pk_path in self.many_related:
+            pks = {}
+
+            for parent_pk, pk in related_model.objects.filter(
+                    **{f'{lookup}__in': {row[pk_path] for row in rows}}).values_list(lookup, 'pk'):
+                pks.setdefault(parent_pk, []).append(pk)
+
+            for row in rows:
+                row[f'{path}__pks'] = pks.get(row[pk_path], [])
+
+        return rows
+
+    def serialize_rows(self, rows):
+        """
+        :return: A `ReturnList` of the representations of the rows.
+        """
+        return ReturnList([self.to_representation(row) for row in rows], serializer=self.serializer)
+
+    def serialize(self, queryset):
+        """
+        Serialize the rows of `queryset`.
+
+        :return: A `ReturnList` of the representations of the rows.
+        """
+        return self.serialize_rows(self.get_rows(queryset))
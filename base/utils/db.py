@@ -1,4 +1,62 @@
+from django.core.exceptions import FieldDoesNotExist
 from django.db import transaction
+from django.db.models import BooleanField, FloatField, Func, Prefetch, Value
+from djmoney.models.fields import MoneyField
+from djmoney.utils import get_currency_field_name
+from rest_framework import serializers
+
+from base.serializers import IncludedField
+
+
+class RowComparison(Func):
+    """
+    Compare rows of columns in a single condition, e.g. `(created_at, id) < (%s, %s)`, which the
+    database can answer with one range scan of an index on the columns.
+    """
+    output_field = BooleanField()
+
+    def __init__(self, lhs, operator, rhs):
+        if len(lhs) != len(rhs):
+            raise ValueError('Compared rows must have the same length.')
+
+        self.operator = operator
+        super().__init__(*lhs, *rhs)
+
+    def as_sql(self, compiler, connection):
+        parts, params = [], []
+
+        for expression in self.get_source_expressions():
+            sql, expression_params = compiler.compile(expression)
+            parts.append(sql)
+            params.extend(expression_params)
+
+        size = len(parts) // 2
+
+        return f'({", ".join(parts[:size])}) {self.operator} ({", ".join(parts[size:])})', params
+
+
+class TrigramWordSimilar(Func):
+    """
+    Whether `expression` has a word or a prefix of a word that is similar to `string`, i.e. the
+    `expression %> string` operator of `pg_trgm`, which a trigram index on `expression` answers.
+    """
+    arg_joiner = ' %%> '
+    template = '%(expressions)s'
+    output_field = BooleanField()
+
+    def __init__(self, expression, string, **extra):
+        super().__init__(expression, Value(string), **extra)
+
+
+class TrigramWordSimilarity(Func):
+    """
+    The similarity of `string` to the most similar word or prefix of a word in `expression`.
+    """
+    function = 'word_similarity'
+    output_field = FloatField()
+
+    def __init__(self, string, expression, **extra):
+        super().__init__(Value(string), expression, **extra)
 
 
 @transaction.atomic
@@ -11,3 +69,113 @@ def save_in_bulk(instances, **save_options):
     """
     for instance in instances:
         instance.save(**save_options)
+
+
+def get_query_plan(serializer, model, prefix=''):
+    """
+    Work out the related objects and columns a serializer reads from instances of `model`.
+
+    Nested serializers are selected with a join, nested lists and many-to-many fields are
+    prefetched, and only the columns of serialized fields are loaded. All the columns of a model
+    are loaded if its serializer has method fields or fields that are not model fields, because
+    their attributes cannot be inspected. Method fields that read related objects can declare
+    them in the `select_related` tuple of the serializer `Meta`.
+
+    :param serializer: The serializer instance.
+    :param model: The model of the serialized instances.
+    :param prefix: The lookup path from the queryset model to `model`.
+
+    :return: Tuple of the `select_related` paths, the `prefetch_related` lookups
+             and the `only` fields.
+    """
+    select, prefetch, only = [], [], {prefix + model._meta.pk.name}
+    load_all = False
+
+    for name in getattr(getattr(serializer, 'Meta', None), 'select_related', ()):
+        related_model = model._meta.get_field(name).related_model
+        select.append(prefix + name)
+        only.add(prefix + name)
+        only.update(f'{prefix}{name}__{related_field.name}'
+                    for related_field in related_model._meta.concrete_fields)
+
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+
+        if isinstance(field, IncludedField):
+            field = field.serializer
+
+        if isinstance(field, serializers.SerializerMethodField) or field.source == '*':
+            load_all = True
+            continue
+
+        name = field.source_attrs[0]
+
+        try:
+            model_field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            load_all = True
+            continue
+
+        if isinstance(field, serializers.ListSerializer):
+            related_model = model_field.related_model
+            child_plan = get_query_plan(field.child, related_model)
+
+            # Prefetched rows are matched to their parent by their foreign key.
+            if model_field.one_to_many:
+                child_plan[2].add(model_field.field.name)
+
+            prefetch.append(Prefetch(prefix + name, queryset=apply_query_plan(
+                related_model.objects.all(), child_plan)))
+        elif isinstance(field, serializers.ManyRelatedField):
+            related_model = model_field.related_model
+            prefetch.append(Prefetch(prefix + name, queryset=related_model.objects.only(
+                related_model._meta.pk.name)))
+        elif isinstance(field, serializers.BaseSerializer):
+            related_select, related_prefetch, related_only = get_query_plan(
+                field, model_field.related_model, f'{prefix}{name}__')
+            select += [prefix + name, *related_select]
+            prefetch += related_prefetch
+            only |= {prefix + name, *related_only}
+        elif len(field.source_attrs) > 1 and model_field.many_to_one:
+            select.append(prefix + name)
+            only.update(f'{prefix}{name}__{related_field.name}'
+                        for related_field in model_field.related_model._meta.concrete_fields)
+            only.add(prefix + name)
+        elif not model_field.concrete:
+            load_all = True
+        else:
+            only.add(prefix + name)
+
+            # Money amounts are read with their currency.
+            if isinstance(model_field, MoneyField):
+                only.add(prefix + get_currency_field_name(name, model_field))
+
+    if load_all:
+        only.update(prefix + model_field.name for model_field in model._meta.concrete_fields)
+
+    return select, prefetch, only
+
+
+def plan_queryset(queryset, serializer, defer=True):
+    """
+    Select, prefetch and load only what `serializer` reads from the rows of `queryset`,
+    so serializing a list makes the same number of queries whatever its length.
+
+    :param queryset: The queryset to plan.
+    :param serializer: The serializer, or serializer class, of a single row.
+    :param defer: Whether to only load the columns the serializer reads.
+
+    :return: The planned queryset.
+    """
+    if isinstance(serializer, type):
+        serializer = serializer()
+
+    return apply_query_plan(queryset, get_query_plan(serializer, queryset.model), defer)
+
+
+def apply_query_plan(queryset, plan, defer=True):
+    select, prefetch, only = plan
+    queryset = queryset.select_related(*select).prefetch_related(*prefetch)
+
+    return queryset.only(*only) if defer else queryset
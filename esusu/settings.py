@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'rest_framework',
     'djmoney',
@@ -94,11 +95,20 @@ DATABASES = {
         'USER': env('DATABASE_USER'),
         'PASSWORD': '',
         'HOST': env('DATABASE_HOST'),
-        'PORT': env('DATABASE_PORT')
+        'PORT': env('DATABASE_PORT'),
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# The local memory cache evicts the least recently used entries once it holds `max_entries` entries.
+
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://?max_entries=10000')
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -151,9 +161,100 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_RENDERER_CLASSES': (
         'base.renderers.JSONRenderer',
+        'base.renderers.MessagePackRenderer',
         'rest_framework.renderers.JSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer'),
+    'DEFAULT_PARSER_CLASSES': (
+        'rest_framework.parsers.JSONParser',
+        'base.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser'),
+}
+
+# The similarity of a group name word to a misspelt search word for the group to match the search.
+# The default threshold of `pg_trgm` is 0.6, which misses most words with two typos.
+SEARCH_WORD_SIMILARITY = env.float('SEARCH_WORD_SIMILARITY', default=0.4)
+
+# The number of rows streamed responses read from the database and send at a time.
+STREAM_CHUNK_SIZE = env.int('STREAM_CHUNK_SIZE', default=500)
+
+# Authentication settings
+# The number of decoded tokens each process keeps until they expire, and the number of seconds
+# users are kept in the cache. Cached users are removed when they are saved.
+JWT_CACHE_SIZE = env.int('JWT_CACHE_SIZE', default=10000)
+USER_CACHE_TIMEOUT = env.int('USER_CACHE_TIMEOUT', default=300)
+
+# Paystack settings
+# https://paystack.com/docs/api/
+
+PAYSTACK_BASE_URL = env('PAYSTACK_BASE_URL', default='https://api.paystack.co')
+
+# The maximum number of Paystack requests a batch job makes at the same time.
+PAYSTACK_MAX_CONCURRENCY = env.int('PAYSTACK_MAX_CONCURRENCY', default=8)
+
+# The number of connections to Paystack each process keeps alive.
+PAYSTACK_POOL_SIZE = env.int('PAYSTACK_POOL_SIZE', default=PAYSTACK_MAX_CONCURRENCY)
+
+# The number of connections to Paystack each event loop keeps open for async clients.
+PAYSTACK_ASYNC_POOL_SIZE = env.int('PAYSTACK_ASYNC_POOL_SIZE', default=100)
+
+# The number of seconds to wait for Paystack to accept a connection and to send a response.
+PAYSTACK_CONNECT_TIMEOUT = env.float('PAYSTACK_CONNECT_TIMEOUT', default=5)
+PAYSTACK_READ_TIMEOUT = env.float('PAYSTACK_READ_TIMEOUT', default=30)
+
+# The number of times a failed Paystack request is retried, and the backoff factor between retries.
+# Only requests that did not reach Paystack and GET requests are retried.
+PAYSTACK_RETRIES = env.int('PAYSTACK_RETRIES', default=3)
+PAYSTACK_RETRY_BACKOFF = env.float('PAYSTACK_RETRY_BACKOFF', default=0.5)
+
+# The number of requests per second made to each family of Paystack endpoints by a process,
+# e.g. `charge=25;transfer=25;verify=50;other=10`.
+PAYSTACK_RATE_LIMITS = {
+    'charge': 25, 'transfer': 25, 'verify': 50, 'other': 10,
+    **env.dict('PAYSTACK_RATE_LIMITS', cast={'value': float}, default={})
 }
+
+# The circuit of an endpoint family opens when `PAYSTACK_BREAKER_THRESHOLD` requests fail within
+# `PAYSTACK_BREAKER_WINDOW` seconds, and requests are rejected for `PAYSTACK_BREAKER_TIMEOUT` seconds.
+PAYSTACK_BREAKER_THRESHOLD = env.int('PAYSTACK_BREAKER_THRESHOLD', default=10)
+PAYSTACK_BREAKER_WINDOW = env.float('PAYSTACK_BREAKER_WINDOW', default=30)
+PAYSTACK_BREAKER_TIMEOUT = env.float('PAYSTACK_BREAKER_TIMEOUT', default=30)
+
+# The number of seconds resolved account numbers and transfer recipients are cached for.
+PAYSTACK_CACHE_TIMEOUT = env.int('PAYSTACK_CACHE_TIMEOUT', default=60 * 60 * 24)
+
+# The maximum number of transfers Paystack accepts in a single bulk transfer request.
+PAYSTACK_BULK_TRANSFER_LIMIT = env.int('PAYSTACK_BULK_TRANSFER_LIMIT', default=100)
+
+# Charge savings with Paystack bulk charges, whose results are received through the webhook.
+PAYSTACK_BULK_CHARGE = env.bool('PAYSTACK_BULK_CHARGE', default=False)
+
+# The maximum number of charges sent in a single bulk charge request.
+PAYSTACK_BULK_CHARGE_LIMIT = env.int('PAYSTACK_BULK_CHARGE_LIMIT', default=100)
+
+# The number of run items a savings or payment run processes and saves at a time.
+RUN_CHUNK_SIZE = env.int('RUN_CHUNK_SIZE', default=500)
+
+# The number of seconds a worker can hold run items before other workers can claim them.
+RUN_LEASE_TIMEOUT = env.int('RUN_LEASE_TIMEOUT', default=300)
+
+# The number of outbox messages the outbox worker sends at a time, the number of times a message
+# is attempted, and the number of seconds before the first retry. The delay doubles after each attempt.
+OUTBOX_BATCH_SIZE = env.int('OUTBOX_BATCH_SIZE', default=100)
+OUTBOX_MAX_ATTEMPTS = env.int('OUTBOX_MAX_ATTEMPTS', default=8)
+OUTBOX_RETRY_DELAY = env.int('OUTBOX_RETRY_DELAY', default=30)
+
+# The number of seconds a worker can hold outbox messages before other workers can claim them.
+OUTBOX_LEASE_TIMEOUT = env.int('OUTBOX_LEASE_TIMEOUT', default=300)
+
+# The number of queued webhook events the webhook consumer applies at a time.
+WEBHOOK_BATCH_SIZE = env.int('WEBHOOK_BATCH_SIZE', default=500)
+
+# The number of seconds a transaction stays pending before the reconciliation job verifies it,
+# and the number of transactions it verifies and saves at a time.
+RECONCILE_AFTER = env.int('RECONCILE_AFTER', default=3600)
+RECONCILE_CHUNK_SIZE = env.int('RECONCILE_CHUNK_SIZE', default=1000)
+
 # The model to use to represent a user.
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-user-model
 
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0005_alter_cycle_end_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(condition=models.Q(('is_searchable', True)), fields=['created_at', 'id'], name='group_searchable_created'),
+        ),
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['group', 'created_at', 'id'], name='membership_group_created'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:33
+
+from django.contrib.postgres.operations import TrigramExtension
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+# Keep the search vector of a group up to date when its name or description changes,
+# including in bulk updates that skip the model.
+CREATE_SEARCH_TRIGGER = """
+CREATE FUNCTION groups_group_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER groups_group_search_vector
+    BEFORE INSERT OR UPDATE OF name, description, search_vector ON groups_group
+    FOR EACH ROW EXECUTE FUNCTION groups_group_search_vector();
+
+UPDATE groups_group SET search_vector = NULL;
+"""
+
+DROP_SEARCH_TRIGGER = """
+DROP TRIGGER groups_group_search_vector ON groups_group;
+DROP FUNCTION groups_group_search_vector();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0006_keyset_indexes'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='group',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunSQL(CREATE_SEARCH_TRIGGER, DROP_SEARCH_TRIGGER),
+        migrations.AddIndex(
+            model_name='group',
+            index=django.contrib.postgres.indexes.GinIndex(condition=models.Q(('is_searchable', True)), fields=['search_vector'], name='group_search_vector'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=django.contrib.postgres.indexes.GinIndex(condition=models.Q(('is_searchable', True)), fields=['name'], name='group_name_trigram', opclasses=['gin_trgm_ops']),
+        ),
+    ]
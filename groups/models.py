@@ -1,4 +1,6 @@
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
 from django.utils.translation import gettext_lazy as _
@@ -27,6 +29,20 @@ class Group(TimestampedModel):
                               related_name='owned_groups', verbose_name=_('owner'), on_delete=models.SET_NULL)
     is_searchable = models.BooleanField(
         default=True, verbose_name=_('searchable group'))
+    # The weighted words of the name and description, kept up to date by a trigger.
+    # See the `0007_group_search` migration and `base.filters.RankedSearchFilter`.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta(TimestampedModel.Meta):
+        # Pages of the searchable groups, see `base.pagination.KeysetPagination`.
+        indexes = [
+            models.Index(fields=['created_at', 'id'], condition=models.Q(is_searchable=True),
+                         name='group_searchable_created'),
+            GinIndex(fields=['search_vector'], condition=models.Q(is_searchable=True),
+                     name='group_search_vector'),
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], condition=models.Q(is_searchable=True),
+                     name='group_name_trigram'),
+        ]
 
     def __str__(self):
         return self.name
@@ -44,6 +60,10 @@ class Membership(models.Model):
     class Meta:
         unique_together = ('user', 'group',)
         ordering = ['-created_at']
+        # Pages of the members of a group, see `base.pagination.KeysetPagination`.
+        indexes = [
+            models.Index(fields=['group', 'created_at', 'id'], name='membership_group_created'),
+        ]
 
 
 class Cycle(models.Model):
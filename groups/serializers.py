@@ -3,21 +3,22 @@ from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 from rest_framework.exceptions import PermissionDenied
 
+from base.serializers import FieldsetMixin
 from users.serializers import UserSerializer
 
 from .models import Group, Membership, Cycle
 
 
-class GroupSerializer(serializers.ModelSerializer):
+class GroupSerializer(FieldsetMixin, serializers.ModelSerializer):
     owner = UserSerializer(required=False, read_only=True)
 
     class Meta:
         model = Group
-        fields = '__all__'
+        exclude = ('search_vector',)
         read_only_fields = ('token', 'current_cycle', 'owner',)
 
 
-class MembershipSerializer(serializers.ModelSerializer):
+class MembershipSerializer(FieldsetMixin, serializers.ModelSerializer):
     full_name = serializers.SerializerMethodField()
     is_owner = serializers.SerializerMethodField()
     email = serializers.SerializerMethodField()
@@ -29,6 +30,8 @@ class MembershipSerializer(serializers.ModelSerializer):
         fields = ('id', 'full_name', 'email', 'group_name', 'group_token', 'is_owner',
                   'is_admin', 'group', 'user', 'created_at')
         read_only_fields = ('user', 'is_admin', 'is_owner', 'full_name',)
+        # Read by the method fields.
+        select_related = ('user', 'group')
 
     def validate(self, attrs):
         group = Group.objects.prefetch_related(
@@ -54,6 +57,24 @@ class MembershipSerializer(serializers.ModelSerializer):
         return (obj and obj.user_id and obj.group_id and obj.group.owner_id and
                 obj.user_id == obj.group.owner_id)
 
+    # Read by `base.serializers.ValuesSerializer`, which has no instances to pass to the methods above.
+
+    def get_full_name_from_values(self, values):
+        return f"{values['user__first_name']} {values['user__last_name']}"
+
+    def get_email_from_values(self, values):
+        return values['user__email']
+
+    def get_group_name_from_values(self, values):
+        return values['group__name']
+
+    def get_group_token_from_values(self, values):
+        return values['group__token']
+
+    def get_is_owner_from_values(self, values):
+        return (values['user_id'] and values['group_id'] and values['group__owner_id'] and
+                values['user_id'] == values['group__owner_id'])
+
 
 class _MembershipBulkSerializer(serializers.Serializer):
     email = serializers.CharField(required=True)
@@ -64,7 +85,7 @@ class MembershipBulkSerializer(serializers.Serializer):
     bulk_memberships = _MembershipBulkSerializer(many=True)
 
 
-class CycleSerializer(serializers.ModelSerializer):
+class CycleSerializer(FieldsetMixin, serializers.ModelSerializer):
     group = GroupSerializer(read_only=True)
 
     class Meta:
@@ -1,7 +1,7 @@
 import secrets
 from datetime import datetime
 
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.utils.translation import gettext_lazy as _
 
 from rest_framework import status
@@ -9,13 +9,15 @@ from rest_framework.decorators import action
 from rest_framework.exceptions import NotFound, PermissionDenied
 from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
-from rest_framework.filters import SearchFilter
 from rest_framework.viewsets import ModelViewSet, ViewSet
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 
 from django_pglocks import advisory_lock
 
-from base.mixins import SuccessMessageMixin
+from base.filters import RankedSearchFilter
+from base.mixins import (FieldsetMixin, KeysetPaginationMixin, QueryPlanningMixin, StreamingMixin, SuccessMessageMixin,
+                         ValuesMixin)
+from base.utils.db import plan_queryset
 from base.permissions import IsOwnerOrReadOnly
 from transactions.models import PaymentList, SavingsList
 from transactions.serializers import PaymentListSerializer, SavingsListSerializer
@@ -26,12 +28,23 @@ from .serializers import GroupSerializer, MembershipSerializer, MembershipBulkSe
 from . import services
 
 
-class GroupViewSet(SuccessMessageMixin, ModelViewSet):
+class GroupViewSet(SuccessMessageMixin, FieldsetMixin, KeysetPaginationMixin, StreamingMixin, ValuesMixin,
+                   QueryPlanningMixin, ModelViewSet):
     queryset = Group.objects.all()
     serializer_class = GroupSerializer
     permission_classes = (IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly,)
-    filter_backends = [SearchFilter]
-    search_fields = ['name', 'description']
+    filter_backends = [RankedSearchFilter]
+    search_vector_field = 'search_vector'
+    search_trigram_field = 'name'
+    read_from_values = True
+
+    def list(self, request, *args, **kwargs):
+        if not request.query_params.get(RankedSearchFilter.search_param):
+            return super().list(request, *args, **kwargs)
+
+        # Searches set the trigram similarity threshold for the transaction. See `RankedSearchFilter`.
+        with transaction.atomic():
+            return super().list(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user,
@@ -41,7 +54,6 @@ class GroupViewSet(SuccessMessageMixin, ModelViewSet):
 
     def get_queryset(self):
         qs = super().get_queryset()
-        qs = qs.select_related('owner')
 
         if self.action == 'list':
             qs = qs.filter(is_searchable=True)
@@ -70,9 +82,12 @@ class GroupViewSet(SuccessMessageMixin, ModelViewSet):
             cycle = Cycle.objects.filter(cycle_number=cycle_number).first()
             savings = savings.filter(cycle=cycle)
 
-        serializer = SavingsListSerializer(savings, many=True)
+        savings = plan_queryset(savings, SavingsListSerializer(context=self.get_serializer_context()))
 
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        if self.should_stream():
+            return self.get_streaming_response(savings, SavingsListSerializer)
+
+        return self.get_list_response(savings, SavingsListSerializer(context=self.get_serializer_context()))
 
     @action(methods=['GET'], detail=True)
     def payments(self, request, pk=None):
@@ -83,15 +98,22 @@ class GroupViewSet(SuccessMessageMixin, ModelViewSet):
             cycle = Cycle.objects.filter(cycle_number=cycle_number).first()
             payments = payments.filter(cycle=cycle)
 
-        serializer = PaymentListSerializer(payments, many=True)
+        payments = plan_queryset(payments, PaymentListSerializer(context=self.get_serializer_context()))
 
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        if self.should_stream():
+            return self.get_streaming_response(payments, PaymentListSerializer)
+
+        # Payments are paged in payout order.
+        return self.get_list_response(payments, PaymentListSerializer(context=self.get_serializer_context()),
+                                      ordering=('order', 'id'))
 
 
-class MembershipViewSet(SuccessMessageMixin, ModelViewSet):
+class MembershipViewSet(SuccessMessageMixin, FieldsetMixin, KeysetPaginationMixin, ValuesMixin, QueryPlanningMixin,
+                        ModelViewSet):
     serializer_class = MembershipSerializer
     queryset = Membership.objects.all()
     permission_classes = (IsAuthenticatedOrReadOnly,)
+    read_from_values = True
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -100,9 +122,6 @@ class MembershipViewSet(SuccessMessageMixin, ModelViewSet):
             group = self.request.query_params.get('group')
             qs = qs.filter(group=group)
 
-        if self.action == 'destroy':
-            qs = qs.select_related('group')
-
         return qs
 
     def perform_create(self, serializer):
@@ -175,7 +194,7 @@ class CycleViewSet(SuccessMessageMixin, ViewSet):
 
     def retrieve(self, request, pk=None):
         try:
-            instance = Cycle.objects.get(pk=pk)
+            instance = plan_queryset(Cycle.objects.all(), self.serializer_class).get(pk=pk)
             serializer = self.serializer_class(instance)
         except Cycle.DoesNotExist:
             raise NotFound()
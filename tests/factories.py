@@ -1,3 +1,4 @@
+from datetime import date
 from secrets import token_hex
 from random import randint, choice
 
@@ -30,7 +31,7 @@ class GroupFactory(Factory):
     max_capacity = randint(1, 20)
     amount_to_save = choice([1000, 1500, 2000])
     owner = factory.SubFactory('tests.factories.UserFactory')
-    token = token_hex(10).upper()
+    token = factory.LazyFunction(lambda: token_hex(10).upper())
 
 
 class MembershipFactory(Factory):
@@ -53,3 +54,43 @@ class BankFactory(Factory):
     transfer_recipient = factory.Sequence(lambda n: f'RCP_t0ya41mp35flk4{n}.')
     is_default = False
     user = factory.SubFactory('tests.factories.UserFactory')
+
+
+class CycleFactory(Factory):
+    class Meta:
+        model = 'groups.Cycle'
+
+    cycle_number = 1
+    start_date = factory.LazyFunction(date.today)
+    group = factory.SubFactory('tests.factories.GroupFactory')
+
+
+class CardFactory(Factory):
+    class Meta:
+        model = 'transactions.Card'
+
+    reference = factory.Sequence(lambda n: f'T{n:015d}')
+    authorization_code = factory.Sequence(lambda n: f'AUTH_{n:010d}')
+    card_type = 'visa'
+    last4 = '4081'
+    exp_month = '12'
+    exp_year = '2030'
+    bin = '408408'
+    bank = 'TEST BANK'
+    channel = 'card'
+    signature = factory.Sequence(lambda n: f'SIG_{n:012d}')
+    reusable = True
+    country_code = 'NG'
+    is_default = False
+    user = factory.SubFactory('tests.factories.UserFactory')
+
+
+class TransactionFactory(Factory):
+    class Meta:
+        model = 'transactions.Transaction'
+
+    reference = factory.Sequence(lambda n: f'T{n:015d}')
+    amount = 1000
+    type = 'savings'
+    status = 'success'
+    user = factory.SubFactory('tests.factories.UserFactory')
@@ -15,3 +15,119 @@ def client():
             return True
 
     return _Client()
+
+
+@pytest.fixture(autouse=True)
+def cache():
+    from django.core.cache import cache
+
+    yield cache
+
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def throttling():
+    from transactions import throttling
+
+    throttling.reset()
+
+    yield throttling
+
+    throttling.reset()
+
+
+@pytest.fixture
+def paystack():
+    from secrets import token_hex
+    from unittest import mock
+
+    from transactions.utils import Paystack
+
+    def charge_authorization(self, authorization_code, email, amount, reference=None):
+        return {'status': True, 'message': 'Charge attempted',
+                'data': {'amount': amount * 10, 'reference': reference or token_hex(8), 'status': 'success'}}
+
+    def initiate_transfer(self, recipient, amount, reference=None):
+        return {'status': True, 'message': 'Transfer has been queued',
+                'data': {'amount': amount, 'reference': reference or token_hex(8), 'status': 'pending'}}
+
+    def bulk_charge(self, charges):
+        return {'status': True, 'message': 'Charges have been queued',
+                'data': {'batch_code': f'BCH_{token_hex(6)}', 'total_charges': len(charges), 'status': 'active'}}
+
+    def bulk_transfers(self, transfers):
+        return {'status': True, 'message': f'{len(transfers)} transfers queued.',
+                'data': [{'amount': transfer['amount'], 'reference': transfer['reference'],
+                          'recipient': transfer['recipient'], 'status': 'received'} for transfer in transfers]}
+
+    def verify_account_number(self, account_number, bank_code):
+        if account_number == '0000000000':
+            return {'status': False, 'message': 'Could not resolve account name. Check parameters or try again.'}
+
+        return {'status': True, 'message': 'Account number resolved',
+                'data': {'account_number': account_number, 'account_name': 'JOHN DOE', 'bank_id': 9}}
+
+    def create_transfer_recipient(self, **kwargs):
+        return {'status': True, 'message': 'Transfer recipient created successfully',
+                'data': {'recipient_code': f'RCP_{token_hex(8)}',
+                         'details': {'account_number': kwargs['account_number'], 'account_name': kwargs['name'],
+                                     'bank_code': kwargs['bank_code'], 'bank_name': 'Test Bank'}}}
+
+    def verify(self, reference):
+        return {'status': False, 'message': 'Transaction reference not found'}
+
+    with mock.patch.object(Paystack, 'create_refund', autospec=True,
+                           return_value={'status': True}) as create_refund, \
+            mock.patch.object(Paystack, 'verify_account_number', autospec=True,
+                              side_effect=verify_account_number) as verify_account_number, \
+            mock.patch.object(Paystack, 'create_transfer_recipient', autospec=True,
+                              side_effect=create_transfer_recipient) as create_transfer_recipient, \
+            mock.patch.object(Paystack, 'charge_authorization', autospec=True,
+                              side_effect=charge_authorization) as charge, \
+            mock.patch.object(Paystack, 'initiate_transfer', autospec=True,
+                              side_effect=initiate_transfer) as transfer, \
+            mock.patch.object(Paystack, 'bulk_charge', autospec=True,
+                              side_effect=bulk_charge) as bulk_charge, \
+            mock.patch.object(Paystack, 'bulk_transfers', autospec=True,
+                              side_effect=bulk_transfers) as bulk_transfers, \
+            mock.patch.object(Paystack, 'verify_transaction', autospec=True,
+                              side_effect=verify) as verify_transaction, \
+            mock.patch.object(Paystack, 'verify_transfer', autospec=True,
+                              side_effect=verify) as verify_transfer:
+        yield mock.Mock(create_refund=create_refund, verify_account_number=verify_account_number,
+                        create_transfer_recipient=create_transfer_recipient, charge_authorization=charge,
+                        initiate_transfer=transfer, bulk_charge=bulk_charge, bulk_transfers=bulk_transfers,
+                        verify_transaction=verify_transaction,
+                        verify_transfer=verify_transfer)
+
+
+@pytest.fixture
+def paystack_server(settings):
+    from .paystack import FakePaystackServer
+
+    server = FakePaystackServer().start()
+    settings.PAYSTACK_BASE_URL = server.url
+    # Only tests of the rate limits are rate limited.
+    settings.PAYSTACK_RATE_LIMITS = dict.fromkeys(settings.PAYSTACK_RATE_LIMITS, 10000)
+
+    yield server
+
+    server.stop()
+
+
+@pytest.fixture
+def paystack_tls_server(monkeypatch, settings):
+    import os
+
+    from .paystack import FakePaystackServer
+
+    certfile = os.path.join(os.path.dirname(__file__), 'paystack.pem')
+    server = FakePaystackServer(certfile=certfile).start()
+    settings.PAYSTACK_RATE_LIMITS = dict.fromkeys(settings.PAYSTACK_RATE_LIMITS, 10000)
+    # Trust the self-signed certificate of the server.
+    monkeypatch.setenv('REQUESTS_CA_BUNDLE', certfile)
+
+    yield server
+
+    server.stop()
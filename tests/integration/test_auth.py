@@ -1,7 +1,12 @@
 import pytest
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory
 
+from authentication.backends import JWTAuthentication
 from users.models import User
 
 from .. import factories as f
@@ -89,3 +94,44 @@ def test_login_with_inactive_user(client):
     response = client.post(reverse('auth-login'), login_payload)
 
     assert response.status_code == 403
+
+
+def authenticate(user):
+    request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {user.generate_jwt_token()}')
+
+    return JWTAuthentication().authenticate(request)
+
+
+def test_authentication_reuses_cached_tokens_and_users():
+    user = f.UserFactory()
+    authenticate(user)
+
+    with CaptureQueriesContext(connection) as queries:
+        cached_user, token = authenticate(user)
+
+    assert len(queries) == 0
+    assert cached_user == user
+    assert cached_user.email == user.email
+
+
+def test_saving_a_user_removes_it_from_the_cache():
+    user = f.UserFactory()
+    authenticate(user)
+
+    user.is_active = False
+    user.save()
+
+    with pytest.raises(AuthenticationFailed, match='deactivated'):
+        authenticate(user)
+
+
+def test_saving_a_cached_user_keeps_the_password():
+    user = f.UserFactory(first_name='John')
+    cached_user, token = authenticate(user)
+
+    cached_user.last_name = 'Smith'
+    cached_user.save()
+    user.refresh_from_db()
+
+    assert user.last_name == 'Smith'
+    assert user.check_password('John')
@@ -45,6 +45,52 @@ def test_create_bank(client):
     assert response.status_code == 201
 
 
+def test_create_bank_reuses_resolved_account_and_recipient(client, paystack):
+    user = f.UserFactory()
+    url = reverse('banks-list')
+    data = {'account_number': '0242936133', 'bank_code': '058'}
+
+    client.login(user)
+    response = client.post(url, data)
+    bank = json.loads(response.content)['data']
+    client.delete(reverse('banks-detail', kwargs={'pk': bank['id']}))
+    response = client.post(url, data)
+    response_data = json.loads(response.content)['data']
+
+    assert response.status_code == 201
+    assert response_data['account_name'] == 'JOHN DOE'
+    assert response_data['transfer_recipient'] == bank['transfer_recipient']
+    assert paystack.verify_account_number.call_count == 1
+    assert paystack.create_transfer_recipient.call_count == 1
+
+
+def test_create_existing_bank_does_not_resolve_account_again(client, paystack):
+    bank = f.BankFactory(account_number='0242936133', bank_code='058')
+    url = reverse('banks-list')
+    data = {'account_number': '0242936133', 'bank_code': '058'}
+
+    client.login(bank.user)
+    client.post(url, data)
+    response = client.post(url, data)
+
+    assert response.status_code == 403
+    assert paystack.verify_account_number.call_count == 1
+    assert not paystack.create_transfer_recipient.called
+
+
+def test_failed_account_resolution_is_not_cached(client, paystack):
+    user = f.UserFactory()
+    url = reverse('banks-list')
+    data = {'account_number': '0000000000', 'bank_code': '058'}
+
+    client.login(user)
+    client.post(url, data)
+    response = client.post(url, data)
+
+    assert response.status_code == 400
+    assert paystack.verify_account_number.call_count == 2
+
+
 def test_list_banks(client):
     user = f.UserFactory()
     bank2 = f.BankFactory(user=user)
@@ -81,3 +127,17 @@ def test_delete_non_existent_bank_id(client):
     response = client.delete(url)
 
     assert response.status_code == 404
+
+
+def test_create_bank_while_paystack_is_unavailable(client, paystack_server, settings, throttling):
+    settings.PAYSTACK_BREAKER_THRESHOLD = 1
+    throttling.get_circuit_breaker('verify').record_failure()
+    url = reverse('banks-list')
+
+    client.login(f.UserFactory())
+    response = client.post(url, {'account_number': '0242936133', 'bank_code': '058'})
+
+    assert response.status_code == 503
+    assert response.json() == {'success': False,
+                               'message': 'Paystack verify requests are failing, try again later.'}
+    assert not paystack_server.requests_to('/bank/resolve')
@@ -0,0 +1,153 @@
+from io import StringIO
+import time
+
+from django.core.management import call_command
+from django.urls import reverse
+
+import pytest
+
+from transactions.dispatchers import Dispatcher
+from transactions.models import PaymentList, RunItem, SavingsList
+from transactions.utils import Paystack
+
+from .. import factories as f
+
+
+def test_dispatch_returns_results_in_order():
+    dispatcher = Dispatcher(max_workers=4)
+
+    results = dispatcher.dispatch(list(range(10)), lambda item: item * 2)
+
+    assert [result for item, result, error in results] == [item * 2 for item in range(10)]
+
+
+def test_dispatch_keeps_order_within_a_key():
+    dispatcher = Dispatcher(max_workers=4)
+    calls = []
+    items = [(key, idx) for idx in range(5) for key in 'abc']
+
+    def call(item):
+        time.sleep(0.001 * (5 - item[1]))
+        calls.append(item)
+
+    dispatcher.dispatch(items, call, key=lambda item: item[0])
+
+    for key in 'abc':
+        assert [idx for item_key, idx in calls if item_key == key] == list(range(5))
+
+
+def test_dispatch_collects_errors():
+    dispatcher = Dispatcher(max_workers=2)
+
+    def call(item):
+        if item == 2:
+            raise ValueError('Failed.')
+        return item
+
+    results = dispatcher.dispatch([1, 2, 3], call)
+
+    assert [result for item, result, error in results] == [1, None, 3]
+    assert isinstance(results[1][2], ValueError)
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize('max_workers', [4, 16])
+def test_dispatch_throughput_against_fake_paystack_server(paystack_server, max_workers):
+    paystack_server.latency = 0.02
+    paystack = Paystack()
+    items = [(f'AUTH_{idx}', f'user{idx}@email.com') for idx in range(32)]
+
+    def charge(item):
+        return paystack.charge_authorization(item[0], item[1], 100)
+
+    started_at = time.perf_counter()
+    Dispatcher(max_workers=1).dispatch(items, charge)
+    serial_duration = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    results = Dispatcher(max_workers=max_workers).dispatch(items, charge)
+    concurrent_duration = time.perf_counter() - started_at
+
+    assert all(result['status'] for item, result, error in results)
+    assert concurrent_duration * 2 < serial_duration
+
+
+@pytest.mark.django_db
+def test_save_against_fake_paystack_server(client, paystack_server):
+    group = f.GroupFactory(max_capacity=5, amount_to_save=1000)
+
+    for _ in range(5):
+        membership = f.MembershipFactory(group=group)
+        f.CardFactory(user=membership.user)
+
+    cycle = f.CycleFactory(group=group)
+
+    client.login(group.owner)
+    response = client.get(reverse('transactions-save'))
+    call_command('run_worker', once=True, stdout=StringIO())
+
+    assert response.status_code == 202
+    assert len(paystack_server.requests_to('/transaction/charge_authorization')) == 5
+    assert SavingsList.objects.filter(cycle=cycle).count() == 5
+
+
+@pytest.mark.django_db
+def test_pay_against_fake_paystack_server(client, paystack_server):
+    group = f.GroupFactory(max_capacity=3, amount_to_save=1000)
+    cycle = f.CycleFactory(group=group)
+
+    for idx in range(3):
+        membership = f.MembershipFactory(group=group)
+        f.BankFactory(user=membership.user)
+        PaymentList.objects.create(order=idx + 1, group=group, cycle=cycle,
+                                   payment_date=cycle.start_date, user=membership.user)
+
+    client.login(group.owner)
+    client.get(reverse('transactions-pay'))
+    call_command('run_worker', once=True, stdout=StringIO())
+
+    requests = paystack_server.requests_to('/transfer/bulk')
+    assert len(requests) == 1
+    assert len(requests[0]['transfers']) == 3
+    assert PaymentList.objects.filter(transaction__isnull=False).count() == 3
+
+
+@pytest.mark.django_db
+def test_bulk_charge_against_fake_paystack_server(client, paystack_server, settings):
+    settings.PAYSTACK_BULK_CHARGE = True
+    group = f.GroupFactory(max_capacity=3, amount_to_save=1000)
+
+    for _ in range(3):
+        membership = f.MembershipFactory(group=group)
+        f.CardFactory(user=membership.user)
+
+    f.CycleFactory(group=group)
+
+    client.login(group.owner)
+    client.get(reverse('transactions-save'))
+    call_command('run_worker', once=True, stdout=StringIO())
+
+    requests = paystack_server.requests_to('/bulkcharge')
+    assert len(requests) == 1
+    assert [charge['amount'] for charge in requests[0]] == [100000] * 3
+    assert not paystack_server.requests_to('/transaction/charge_authorization')
+
+
+@pytest.mark.django_db
+def test_open_circuit_defers_run_items(paystack_server, settings):
+    settings.PAYSTACK_BREAKER_THRESHOLD = 2
+    group = f.GroupFactory(max_capacity=10, amount_to_save=1000)
+
+    for _ in range(10):
+        membership = f.MembershipFactory(group=group)
+        f.CardFactory(user=membership.user)
+
+    f.CycleFactory(group=group)
+    paystack_server.failures = 100
+    out = StringIO()
+
+    call_command('run_savings', stdout=out)
+
+    assert RunItem.objects.filter(status=RunItem.PENDING).count() == 10
+    assert paystack_server.failures > 90
+    assert 'circuit open (1 trips' in out.getvalue()
@@ -1,11 +1,22 @@
 from secrets import token_hex
 from random import randint
 import json
+import os
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
 import pytest
 
+from base.filters import RankedSearchFilter
+from groups.models import Group
+from groups.views import GroupViewSet
+from transactions.models import SavingsList
+
 from .. import factories as f
 
 
@@ -79,6 +90,100 @@ def test_search_groups(client):
     assert len(response_data) == 1
 
 
+def search_groups(client, search, **params):
+    response = client.get(reverse('groups-list'), {'search': search, **params})
+
+    return [group['name'] for group in response.json()['data']]
+
+
+def test_search_groups_ranks_names_over_descriptions(client):
+    f.GroupFactory(name='Lagos traders', description='Monthly savings for market traders.')
+    f.GroupFactory(name='Market women savings', description='Weekly contributions.')
+    f.GroupFactory(name='Market savings', description='Saving for the market stalls.')
+    f.GroupFactory(name='Hidden market savings', is_searchable=False)
+
+    assert search_groups(client, 'market') == ['Market savings', 'Market women savings', 'Lagos traders']
+    # Prefixes of words match.
+    assert search_groups(client, 'marke sav') == ['Market savings', 'Market women savings', 'Lagos traders']
+
+
+def test_search_groups_with_misspelt_words(client):
+    f.GroupFactory(name='Abeokuta cooperative')
+    f.GroupFactory(name='Ibadan thrift')
+
+    assert search_groups(client, 'abeokta') == ['Abeokuta cooperative']
+    assert search_groups(client, 'ibadn, thrft') == ['Ibadan thrift']
+    assert search_groups(client, "thrift' & !") == ['Ibadan thrift']
+
+
+@pytest.mark.django_db(transaction=True)
+def test_search_word_similarity_is_only_set_for_the_search(client):
+    f.GroupFactory(name='Abeokuta cooperative')
+    request = Request(APIRequestFactory().get('/', {'search': 'abeokta'}))
+    # Outside of a transaction the similarity is compared to the threshold in the query.
+    groups = RankedSearchFilter().filter_queryset(request, Group.objects.all(), GroupViewSet)
+
+    assert search_groups(client, 'abeokta') == ['Abeokuta cooperative']
+    assert [group.name for group in groups] == ['Abeokuta cooperative']
+
+    with connection.cursor() as cursor:
+        cursor.execute('SHOW pg_trgm.word_similarity_threshold')
+
+        assert cursor.fetchone()[0] == '0.6'
+
+
+def test_search_vectors_follow_updates(client):
+    group = f.GroupFactory(name='Yaba savers')
+    Group.objects.filter(pk=group.pk).update(name='Surulere savers')
+
+    assert search_groups(client, 'surulere') == ['Surulere savers']
+    assert search_groups(client, 'yaba') == []
+
+
+def test_search_results_are_paged_by_rank(client):
+    for idx in range(5):
+        f.GroupFactory(name=f'Savings club {idx}', description='Savings ' * idx)
+
+    names, url = [], f"{reverse('groups-list')}?search=savings&page_size=2"
+
+    while url:
+        content = client.get(url).json()
+        names += [group['name'] for group in content['data']]
+        url = content.get('next')
+
+    assert names == search_groups(client, 'savings')
+    assert sorted(names) == [f'Savings club {idx}' for idx in range(5)]
+
+
+@pytest.mark.benchmark
+def test_search_groups_reads_the_search_indexes(client):
+    # Set BENCHMARK_GROUPS, e.g. to 10000000, to check the plans with more groups.
+    count = int(os.environ.get('BENCHMARK_GROUPS', 200000))
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO groups_group (created_at, updated_at, name, description, max_capacity, amount_to_save, '
+            "amount_to_save_currency, token, is_searchable) SELECT now(), now(), 'Group ' || md5(i::text), "
+            "'Savings group number ' || i, 10, 1000, 'NGN', md5(i::text), i %% 10 > 0 "
+            'FROM generate_series(1, %s) AS i', [count])
+        cursor.execute('ANALYZE groups_group')
+
+    f.GroupFactory(name='Ikorodu weekly contributors')
+
+    for search in ('ikorodu', 'ikorudu contrib'):
+        with CaptureQueriesContext(connection) as queries:
+            names = search_groups(client, search)
+
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN ' + next(query['sql'] for query in queries.captured_queries
+                                             if 'FROM "groups_group"' in query['sql']))
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+
+        assert names == ['Ikorodu weekly contributors']
+        assert 'Seq Scan on groups_group' not in plan
+        assert 'group_search_vector' in plan and 'group_name_trigram' in plan
+
+
 def test_list_groups(client):
     group3 = f.GroupFactory(token=token_hex(10).upper())
     group2 = f.GroupFactory(token=token_hex(10).upper())
@@ -204,3 +309,99 @@ def test_delete_non_existent_group(client):
     response = client.delete(url)
 
     assert response.status_code == 404
+
+
+def test_stream_savings_in_the_same_envelope(client, settings):
+    settings.STREAM_CHUNK_SIZE = 2
+    cycle = f.CycleFactory()
+    SavingsList.objects.bulk_create([
+        SavingsList(cycle=cycle, group=cycle.group, user=cycle.group.owner,
+                    transaction=f.TransactionFactory(user=cycle.group.owner)) for _ in range(5)])
+    url = reverse('groups-savings', kwargs={'pk': cycle.group.id})
+
+    response = client.get(url)
+    streamed_response = client.get(url, {'stream': 'true'})
+    chunks = list(streamed_response.streaming_content)
+
+    assert streamed_response.status_code == 200
+    assert streamed_response['Content-Type'] == 'application/json'
+    assert len(chunks) == 4
+    assert b''.join(chunks) == response.content
+    assert len(json.loads(b''.join(chunks))['data']) == 5
+
+
+def test_stream_empty_payments(client):
+    group = f.GroupFactory()
+    url = reverse('groups-payments', kwargs={'pk': group.id})
+
+    response = client.get(url)
+    streamed_response = client.get(url, {'stream': '1'})
+
+    assert b''.join(streamed_response.streaming_content) == response.content
+    assert json.loads(response.content)['data'] == []
+
+
+def create_savings(count):
+    cycle = f.CycleFactory(group=f.GroupFactory(owner=f.UserFactory()))
+    user = f.UserFactory()
+    SavingsList.objects.bulk_create([
+        SavingsList(cycle=cycle, group=cycle.group, user=user, transaction=f.TransactionFactory(user=user))
+        for _ in range(count)])
+
+    return cycle
+
+
+def test_streamed_savings_query_count_does_not_grow_with_the_rows(client):
+    counts = []
+
+    for count in (2, 20):
+        url = reverse('groups-savings', kwargs={'pk': create_savings(count).group.id})
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url, {'stream': 'true'})
+            content = json.loads(b''.join(response.streaming_content))
+
+        assert len(content['data']) == count
+        counts.append(len(queries))
+
+    assert counts[1] == counts[0]
+
+
+def test_savings_sparse_fieldsets(client):
+    cycle = create_savings(2)
+    url = reverse('groups-savings', kwargs={'pk': cycle.group.id})
+
+    response = client.get(url, {'fields[savingslist]': 'id,cycle', 'fields[cycle]': 'cycle_number,group',
+                                'fields[group]': 'name'})
+
+    assert [row['cycle'] for row in response.json()['data']] == [
+        {'cycle_number': 1, 'group': {'name': cycle.group.name}}] * 2
+
+
+def test_create_group_ignores_sparse_fieldsets(client):
+    client.login(f.UserFactory())
+    data = {'name': 'group name', 'description': 'group description', 'max_capacity': 5, 'amount_to_save': 1000,
+            'is_searchable': True}
+
+    response = client.post(f"{reverse('groups-list')}?fields[group]=name", data)
+
+    assert response.status_code == 201
+    assert Group.objects.get(pk=response.json()['data']['id']).max_capacity == 5
+
+
+def test_savings_include_related_objects_once(client):
+    cycle = create_savings(50)
+    url = reverse('groups-savings', kwargs={'pk': cycle.group.id})
+
+    response = client.get(url)
+    included_response = client.get(url, {'include': 'cycle,group,user', 'stream': 'true'})
+    content = included_response.json()
+    row = content['data'][0]
+
+    assert list(content) == ['success', 'message', 'data', 'included']
+    assert row['cycle'] == cycle.id
+    assert row['transaction']['user'] == row['user']
+    assert content['included']['cycles'] == [{**response.json()['data'][0]['cycle'], 'group': cycle.group.id}]
+    assert [group['owner'] for group in content['included']['groups']] == [cycle.group.owner_id]
+    assert len(content['included']['users']) == 2
+    assert len(included_response.content) * 4 < len(response.content)
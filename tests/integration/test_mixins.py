@@ -0,0 +1,179 @@
+import os
+import time
+from datetime import date
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+import pytest
+
+from base.mixins import get_resource_name
+from base.serializers import ValuesSerializer
+from base.utils.db import get_query_plan, plan_queryset
+from groups.views import CycleViewSet, GroupViewSet, MembershipViewSet
+from transactions.models import PaymentList, SavingsList, Transaction
+from transactions.serializers import SavingsListSerializer
+from transactions.views import BankViewset, TransactionViewset
+
+from users.models import User
+
+from .. import factories as f
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def user(client):
+    user = f.UserFactory()
+    group = f.GroupFactory(owner=user, is_searchable=True)
+    f.MembershipFactory(group=group, user=user)
+    f.BankFactory(user=user)
+    f.CardFactory(user=user)
+    client.login(user)
+    # Cache the user, so authentication makes no queries.
+    client.get(reverse('banks-list'))
+
+    return user
+
+
+def test_resource_names_come_from_the_queryset_or_serializer_model():
+    assert get_resource_name(BankViewset) == 'Bank'
+    assert get_resource_name(GroupViewSet) == 'Group'
+    assert get_resource_name(MembershipViewSet) == 'Membership'
+    assert get_resource_name(CycleViewSet) == 'Cycle'
+    assert get_resource_name(TransactionViewset) is None
+
+
+@pytest.mark.parametrize('url_name, query_count, message', [
+    ('banks-list', 1, 'Banks retrieved successfully.'),
+    ('cards-list', 1, 'Cards retrieved successfully.'),
+    # The groups and their members.
+    ('groups-list', 2, 'Groups retrieved successfully.'),
+])
+def test_list_responses_do_not_query_the_resource_name(client, django_assert_num_queries, user, url_name,
+                                                       query_count, message):
+    with django_assert_num_queries(query_count):
+        response = client.get(reverse(url_name))
+
+    assert response.json()['message'] == message
+
+
+def test_detail_responses_do_not_query_the_resource_name(client, django_assert_num_queries, user):
+    url = reverse('groups-detail', kwargs={'pk': user.owned_groups.get().pk})
+
+    # The group and its members.
+    with django_assert_num_queries(2):
+        response = client.get(url)
+
+    assert response.json()['message'] == 'Group retrieved successfully.'
+
+
+def test_error_responses_do_not_query_the_resource_name(client, django_assert_num_queries, user):
+    with django_assert_num_queries(0):
+        response = client.post(reverse('groups-list'), {}, format='json')
+
+    assert response.status_code == 400
+
+
+def test_empty_lists_have_a_no_records_message(client, django_assert_num_queries, user):
+    group = f.GroupFactory()
+
+    with django_assert_num_queries(1):
+        response = client.get(reverse('groups-savings', kwargs={'pk': group.pk}))
+
+    assert response.json() == {'success': True, 'message': 'No records found.', 'data': []}
+
+
+def create_rows(url_name, user, count):
+    group = user.owned_groups.get()
+    cycle = f.CycleFactory(group=group)
+
+    for idx in range(count):
+        if url_name == 'banks-list':
+            f.BankFactory(user=user)
+        elif url_name == 'cards-list':
+            f.CardFactory(user=user)
+        elif url_name == 'groups-list':
+            f.MembershipFactory(group=f.GroupFactory(is_searchable=True))
+        elif url_name == 'memberships-list':
+            f.MembershipFactory(group=group)
+        elif url_name == 'groups-savings':
+            SavingsList.objects.create(cycle=cycle, group=group, user=f.UserFactory(),
+                                       transaction=f.TransactionFactory())
+        elif url_name == 'groups-payments':
+            PaymentList.objects.create(cycle=cycle, group=group, user=f.UserFactory(), order=idx + 1,
+                                       payment_date=date.today(), transaction=f.TransactionFactory())
+
+    if url_name in ('groups-savings', 'groups-payments'):
+        return reverse(url_name, kwargs={'pk': group.pk})
+
+    return reverse(url_name) + (f'?group={group.pk}' if url_name == 'memberships-list' else '')
+
+
+@pytest.mark.parametrize('url_name', ['banks-list', 'cards-list', 'groups-list', 'memberships-list',
+                                      'groups-savings', 'groups-payments'])
+def test_list_query_counts_do_not_grow_with_the_list(client, user, url_name):
+    url = create_rows(url_name, user, 1)
+
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+
+    create_rows(url_name, user, 5)
+
+    with CaptureQueriesContext(connection) as more_queries:
+        more_response = client.get(url)
+
+    assert len(more_response.json()['data']) > len(response.json()['data'])
+    assert len(more_queries) == len(queries)
+
+
+def test_query_plan_follows_nested_serializers():
+    select, prefetch, only = get_query_plan(SavingsListSerializer(), SavingsList)
+
+    assert set(select) == {'cycle', 'cycle__group', 'cycle__group__owner', 'transaction', 'transaction__user',
+                           'user'}
+    assert [lookup.prefetch_through for lookup in prefetch] == ['cycle__group__members']
+    assert {'transaction__amount', 'transaction__amount_currency', 'cycle__start_date'} <= only
+    assert 'cycle__updated_at' not in only
+
+
+@pytest.mark.parametrize('url_name', ['groups-list', 'memberships-list', 'groups-savings', 'groups-payments'])
+@pytest.mark.parametrize('params', ['', 'include=cycle,user', 'fields[user]=id,full_name'])
+def test_values_responses_match_the_serializers(client, monkeypatch, user, url_name, params):
+    url = create_rows(url_name, user, 3)
+    url += ('&' if '?' in url else '?') + params
+    response = client.get(url)
+
+    monkeypatch.setattr(GroupViewSet, 'read_from_values', False)
+    monkeypatch.setattr(MembershipViewSet, 'read_from_values', False)
+
+    assert response.json() == client.get(url).json()
+
+
+@pytest.mark.benchmark
+def test_values_serializer_reads_more_rows_per_second(user):
+    # Set BENCHMARK_ROWS to measure larger lists.
+    count = int(os.environ.get('BENCHMARK_ROWS', 2000))
+    group = user.owned_groups.get()
+    cycle = f.CycleFactory(group=group)
+    users = User.objects.bulk_create(User(first_name='Ada', last_name=f'Obi {idx}', email=f'ada{idx}@email.com')
+                                     for idx in range(count))
+    transactions = Transaction.objects.bulk_create(
+        Transaction(reference=f'SAV-{idx}', amount=1000, type='savings', status='success', user=row_user)
+        for idx, row_user in enumerate(users))
+    SavingsList.objects.bulk_create(SavingsList(cycle=cycle, group=group, user=row_user, transaction=transaction)
+                                    for row_user, transaction in zip(users, transactions))
+    savings = SavingsList.objects.filter(group=group).order_by('pk')
+
+    started_at = time.perf_counter()
+    fast = ValuesSerializer(SavingsListSerializer()).serialize(savings)
+    fast_time = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    slow = SavingsListSerializer(plan_queryset(savings, SavingsListSerializer()), many=True).data
+    slow_time = time.perf_counter() - started_at
+
+    assert fast == slow
+    assert fast_time < slow_time
@@ -0,0 +1,105 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.urls import reverse
+from django.utils import timezone
+
+import pytest
+
+from transactions.models import Card, OutboxMessage
+from transactions.utils import PaystackError
+
+from .. import factories as f
+
+
+pytestmark = pytest.mark.django_db
+
+
+def run_outbox():
+    out = StringIO()
+    call_command('run_outbox', once=True, stdout=out)
+
+    return out.getvalue()
+
+
+def test_saving_card_queues_refund(paystack):
+    card = f.CardFactory()
+
+    message = OutboxMessage.objects.get()
+    assert message.action == OutboxMessage.REFUND
+    assert message.payload == {'reference': card.reference}
+    assert not paystack.create_refund.called
+
+
+def test_card_is_not_saved_if_its_refund_is_not_queued(client, paystack_server):
+    client.login(f.UserFactory())
+
+    with mock.patch.object(OutboxMessage.objects, 'create', side_effect=DatabaseError()):
+        with pytest.raises(DatabaseError):
+            client.post(reverse('cards-list'), {'reference': 'T000000000000001'})
+
+    assert not Card.objects.exists()
+
+
+def test_run_outbox_sends_refunds(paystack):
+    cards = [f.CardFactory() for _ in range(3)]
+
+    out = run_outbox()
+
+    refunded = sorted(call[1]['reference'] for call in paystack.create_refund.call_args_list)
+    assert refunded == sorted(card.reference for card in cards)
+    assert OutboxMessage.objects.filter(status=OutboxMessage.SENT).count() == 3
+    assert 'Sent 3 outbox messages, 0 failed, 0 will be retried.' in out
+    assert run_outbox() == ''
+
+
+def test_failed_refund_is_retried_with_backoff(paystack, settings):
+    settings.OUTBOX_RETRY_DELAY = 30
+    f.CardFactory()
+    paystack.create_refund.side_effect = PaystackError('Paystack responded with status 503.', 503)
+
+    run_outbox()
+    run_outbox()
+
+    message = OutboxMessage.objects.get()
+    assert paystack.create_refund.call_count == 1
+    assert message.status == OutboxMessage.PENDING
+    assert message.attempts == 1
+    assert message.available_at > timezone.now() + timedelta(seconds=25)
+    assert message.comments == 'Paystack responded with status 503.'
+
+    OutboxMessage.objects.update(available_at=timezone.now())
+    paystack.create_refund.side_effect = None
+    run_outbox()
+
+    message.refresh_from_db()
+    assert message.status == OutboxMessage.SENT
+    assert message.attempts == 2
+
+
+def test_refund_fails_after_max_attempts(paystack, settings):
+    settings.OUTBOX_MAX_ATTEMPTS = 2
+    settings.OUTBOX_RETRY_DELAY = 0
+    f.CardFactory()
+    paystack.create_refund.side_effect = PaystackError('Paystack responded with status 503.', 503)
+
+    run_outbox()
+    run_outbox()
+
+    message = OutboxMessage.objects.get()
+    assert paystack.create_refund.call_count == 2
+    assert message.status == OutboxMessage.FAILED
+
+
+def test_rejected_refund_is_not_retried(paystack):
+    f.CardFactory()
+    paystack.create_refund.return_value = {'status': False, 'message': 'Transaction has been fully reversed'}
+
+    run_outbox()
+
+    message = OutboxMessage.objects.get()
+    assert message.status == OutboxMessage.FAILED
+    assert message.comments == 'Transaction has been fully reversed'
@@ -0,0 +1,133 @@
+import os
+from datetime import date
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+import pytest
+
+from base.pagination import KeysetPagination
+from groups.models import Group, Membership
+from transactions.models import Bank, Card, PaymentList, SavingsList
+
+from .. import factories as f
+
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def user(client):
+    user = f.UserFactory()
+    client.login(user)
+
+    return user
+
+
+def create_rows(url_name, user, count):
+    group = f.GroupFactory(owner=user, is_searchable=False)
+    cycle = f.CycleFactory(group=group)
+
+    for idx in range(count):
+        if url_name == 'banks-list':
+            f.BankFactory(user=user)
+        elif url_name == 'cards-list':
+            f.CardFactory(user=user)
+        elif url_name == 'groups-list':
+            f.GroupFactory(is_searchable=True)
+        elif url_name == 'memberships-list':
+            f.MembershipFactory(group=group)
+        elif url_name == 'groups-savings':
+            SavingsList.objects.create(cycle=cycle, group=group, user=user, transaction=f.TransactionFactory())
+        elif url_name == 'groups-payments':
+            PaymentList.objects.create(cycle=cycle, group=group, user=user, order=idx % 2 + 1,
+                                       payment_date=date.today())
+
+    # Rows created at the same time are ordered by id.
+    now = timezone.now()
+
+    for model in (Bank, Card, Group, Membership, SavingsList):
+        model.objects.update(created_at=now)
+
+    if url_name in ('groups-savings', 'groups-payments'):
+        return reverse(url_name, kwargs={'pk': group.pk})
+
+    return reverse(url_name) + (f'?group={group.pk}' if url_name == 'memberships-list' else '')
+
+
+@pytest.mark.parametrize('url_name, ordering', [
+    ('banks-list', ('-created_at', '-id')),
+    ('cards-list', ('-created_at', '-id')),
+    ('groups-list', ('-created_at', '-id')),
+    ('memberships-list', ('-created_at', '-id')),
+    ('groups-savings', ('-created_at', '-id')),
+    ('groups-payments', ('order', 'id')),
+])
+def test_pages_follow_each_other(client, user, url_name, ordering):
+    url = create_rows(url_name, user, 5)
+    url += ('&' if '?' in url else '?') + 'page_size=2'
+    model = {'banks-list': Bank, 'cards-list': Card, 'groups-list': Group, 'memberships-list': Membership,
+             'groups-savings': SavingsList, 'groups-payments': PaymentList}[url_name]
+    pages = []
+
+    while url:
+        content = client.get(url).json()
+        pages.append([row['id'] for row in content['data']])
+        url = content.get('next')
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert sum(pages, []) == list(model.objects.filter(pk__in=sum(pages, [])).order_by(*ordering)
+                                  .values_list('pk', flat=True))
+
+
+@pytest.mark.parametrize('cursor', [
+    'invalid',
+    KeysetPagination().encode_cursor([timezone.now()]),
+    KeysetPagination().encode_cursor([timezone.now(), 1, 2]),
+])
+def test_invalid_cursors_are_not_found(client, user, cursor):
+    response = client.get(reverse('banks-list'), {'cursor': cursor})
+
+    assert response.status_code == 404
+    assert response.json() == {'success': False, 'message': 'Invalid cursor'}
+
+
+@pytest.mark.benchmark
+def test_deep_pages_cost_the_same_as_the_first_page(client, user):
+    # Set BENCHMARK_ROWS, e.g. to 10000000, to check the plans with more rows.
+    count = int(os.environ.get('BENCHMARK_ROWS', 200000))
+    group = f.GroupFactory(owner=user)
+    cycle = f.CycleFactory(group=group)
+    transaction = f.TransactionFactory(user=user)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO transactions_savingslist (created_at, updated_at, cycle_id, group_id, transaction_id, '
+            "user_id) SELECT now() - i * interval '1 second', now(), %s, %s, %s, %s "
+            'FROM generate_series(1, %s) AS i', [cycle.id, group.id, transaction.id, user.id, count])
+        cursor.execute('ANALYZE transactions_savingslist')
+
+    url = reverse('groups-savings', kwargs={'pk': group.pk})
+    # The last row of the page before the last 150 rows.
+    last = SavingsList.objects.filter(group=group).order_by('created_at', 'id')[150]
+    deep_url = f'{url}?cursor={KeysetPagination().encode_cursor([last.created_at, last.id])}'
+    plans = []
+
+    for page_url in (url, deep_url):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(page_url)
+
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN ' + next(query['sql'] for query in queries.captured_queries
+                                             if 'FROM "transactions_savingslist"' in query['sql']))
+            plans.append('\n'.join(row[0] for row in cursor.fetchall()))
+
+        assert len(response.json()['data']) == 50
+
+    for plan in plans:
+        assert 'savings_group_created' in plan
+        assert 'Sort' not in plan
+
+    assert 'Index Cond: ((group_id = ' in plans[1] and '< ROW(' in plans[1]
@@ -0,0 +1,273 @@
+import asyncio
+import json
+import time
+
+import httpx
+import requests
+
+import pytest
+
+from transactions.dispatchers import Dispatcher
+from transactions.throttling import CircuitBreaker, TokenBucket
+from transactions.utils import (AsyncPaystack, Paystack, PaystackError, PaystackUnavailable, close_async_client,
+                                get_session)
+
+
+def test_session_is_shared_by_clients():
+    assert Paystack().request is Paystack().request
+    assert Paystack().request is get_session()
+
+
+def test_get_requests_are_retried_on_server_errors(paystack_server):
+    paystack_server.failures = 2
+
+    response = Paystack().verify_transfer('PAY-1-1')
+
+    assert response['status']
+    assert len(paystack_server.requests_to('/transfer/verify/PAY-1-1')) == 1
+
+
+def test_post_requests_are_not_retried_on_server_errors(paystack_server):
+    paystack_server.failures = 1
+
+    with pytest.raises(PaystackError):
+        Paystack().initiate_transfer('RCP_1', 1000, reference='PAY-1-1')
+
+    assert paystack_server.failures == 0
+    assert not paystack_server.requests_to('/transfer')
+
+
+def test_requests_time_out(paystack_server, settings):
+    paystack_server.latency = 0.5
+    settings.PAYSTACK_READ_TIMEOUT = 0.1
+
+    with pytest.raises(requests.exceptions.Timeout):
+        Paystack().initiate_transfer('RCP_1', 1000, reference='PAY-1-1')
+
+
+def verify_with_new_connection(paystack, reference):
+    response = requests.get(f'{paystack.base_url}/transfer/verify/{reference}',
+                            headers=paystack.auth_header, timeout=paystack.timeout)
+
+    return json.loads(response.content)
+
+
+def test_pooled_session_reuses_its_connection(paystack_tls_server):
+    paystack = Paystack(base_url=paystack_tls_server.url)
+    calls = 50
+
+    for idx in range(calls):
+        verify_with_new_connection(paystack, f'PAY-1-{idx}')
+    unpooled_connections = paystack_tls_server.connections
+
+    for idx in range(calls):
+        paystack.verify_transfer(f'PAY-1-{idx}')
+    pooled_connections = paystack_tls_server.connections - unpooled_connections
+
+    assert unpooled_connections == calls
+    assert pooled_connections == 1
+
+
+@pytest.mark.benchmark
+def test_pooled_session_latency_against_tls_stub(paystack_tls_server):
+    paystack = Paystack(base_url=paystack_tls_server.url)
+    calls = 50
+
+    started_at = time.perf_counter()
+    for idx in range(calls):
+        verify_with_new_connection(paystack, f'PAY-1-{idx}')
+    unpooled_latency = (time.perf_counter() - started_at) / calls
+
+    started_at = time.perf_counter()
+    for idx in range(calls):
+        paystack.verify_transfer(f'PAY-1-{idx}')
+    pooled_latency = (time.perf_counter() - started_at) / calls
+
+    assert pooled_latency < unpooled_latency
+
+
+def run_async(coroutine):
+    async def run():
+        try:
+            return await coroutine
+        finally:
+            await close_async_client()
+
+    return asyncio.run(run())
+
+
+def test_async_client_sends_the_same_requests(paystack_server):
+    async def call():
+        paystack = AsyncPaystack()
+
+        return await asyncio.gather(
+            paystack.charge_authorization('AUTH_1', 'user@email.com', 1000, reference='SAV-1-1-1'),
+            paystack.bulk_transfers([{'amount': 1000, 'recipient': 'RCP_1', 'reference': 'PAY-1-1'}]),
+            paystack.verify_account_number('0123456789', '058'))
+
+    charge, transfers, account = run_async(call())
+
+    assert charge['data']['reference'] == 'SAV-1-1-1'
+    assert paystack_server.requests_to('/transaction/charge_authorization')[0]['amount'] == '10000'
+    assert transfers['data'][0]['reference'] == 'PAY-1-1'
+    assert paystack_server.requests_to('/transfer/bulk')[0]['currency'] == 'NGN'
+    assert account['data']['account_number'] == '0123456789'
+
+
+@pytest.mark.benchmark
+def test_async_client_overlaps_requests(paystack_server):
+    paystack_server.latency = 0.2
+    calls = 100
+
+    async def call():
+        paystack = AsyncPaystack()
+
+        return await asyncio.gather(*[paystack.verify_transfer(f'PAY-1-{idx}') for idx in range(calls)])
+
+    started_at = time.perf_counter()
+    responses = run_async(call())
+    duration = time.perf_counter() - started_at
+
+    assert all(response['status'] for response in responses)
+    assert duration < calls * paystack_server.latency / 10
+
+
+def test_async_client_retries_get_requests_on_server_errors(paystack_server, settings):
+    settings.PAYSTACK_RETRY_BACKOFF = 0
+    paystack_server.failures = 2
+
+    response = run_async(AsyncPaystack().verify_transaction('SAV-1-1-1'))
+
+    assert response['status']
+
+
+def test_async_client_waits_for_retry_after_on_rate_limits(paystack_server, settings, throttling):
+    settings.PAYSTACK_RETRY_BACKOFF = 0
+    paystack_server.failure_status = 429
+    paystack_server.failures = 1
+
+    started_at = time.monotonic()
+    response = run_async(AsyncPaystack().verify_transaction('SAV-1-1-1'))
+    metrics = throttling.get_metrics()['verify']
+
+    assert response['status']
+    # The fake server asks to retry after a second.
+    assert time.monotonic() - started_at >= 1
+    assert metrics['pauses'] == 1
+    assert metrics['requests'] == 2
+
+
+def test_async_client_does_not_retry_post_requests_on_server_errors(paystack_server, settings):
+    settings.PAYSTACK_RETRY_BACKOFF = 0
+    paystack_server.failures = 1
+
+    with pytest.raises(PaystackError):
+        run_async(AsyncPaystack().create_refund('SAV-1-1-1'))
+
+    assert paystack_server.failures == 0
+    assert not paystack_server.requests_to('/refund')
+
+
+def test_async_client_requests_time_out(paystack_server, settings):
+    paystack_server.latency = 0.5
+    settings.PAYSTACK_READ_TIMEOUT = 0.1
+
+    with pytest.raises(httpx.TimeoutException):
+        run_async(AsyncPaystack().create_refund('SAV-1-1-1'))
+
+
+def test_token_bucket_delays_requests_over_the_rate():
+    bucket = TokenBucket(rate=10, capacity=2)
+
+    waits = [bucket.reserve() for _ in range(4)]
+
+    assert waits[:2] == [0, 0]
+    assert waits[2] == pytest.approx(0.1, abs=0.01)
+    assert waits[3] == pytest.approx(0.2, abs=0.01)
+    assert bucket.get_metrics()['waits'] == 2
+
+
+def test_paused_token_bucket_delays_requests():
+    bucket = TokenBucket(rate=10)
+
+    bucket.pause(2)
+
+    assert bucket.reserve() == pytest.approx(2.1, abs=0.01)
+
+
+def test_circuit_breaker_opens_on_a_burst_of_failures():
+    breaker = CircuitBreaker(threshold=3, window=10, timeout=0.05)
+
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+
+    assert not breaker.allow()
+    assert breaker.get_metrics() == {'state': CircuitBreaker.OPEN, 'failures': 3, 'trips': 1, 'rejected': 1}
+
+    time.sleep(0.05)
+
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_circuit_breaker_opens_again_if_the_trial_request_fails():
+    breaker = CircuitBreaker(threshold=1, window=10, timeout=0)
+    breaker.record_failure()
+
+    assert breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.trips == 2
+
+
+def test_rate_limited_request_pauses_its_endpoint_family(paystack_server, throttling):
+    paystack_server.failure_status = 429
+    paystack_server.failures = 1
+
+    with pytest.raises(PaystackError) as error:
+        Paystack().initiate_transfer('RCP_1', 1000, reference='PAY-1-1')
+
+    metrics = throttling.get_metrics()
+    assert error.value.paystack_status_code == 429
+    assert metrics['transfer']['pauses'] == 1
+    assert metrics['transfer']['tokens'] < 0
+    assert throttling.get_token_bucket('charge').reserve() == 0
+
+
+def test_circuit_opens_after_server_errors(paystack_server, settings, throttling):
+    settings.PAYSTACK_BREAKER_THRESHOLD = 2
+    paystack_server.failures = 2
+    paystack = Paystack()
+
+    for _ in range(2):
+        with pytest.raises(PaystackError):
+            paystack.charge_authorization('AUTH_1', 'user@email.com', 1000, reference='SAV-1-1-1')
+
+    with pytest.raises(PaystackUnavailable):
+        paystack.charge_authorization('AUTH_1', 'user@email.com', 1000, reference='SAV-1-1-1')
+
+    assert not paystack_server.requests_to('/transaction/charge_authorization')
+    assert paystack.verify_transaction('SAV-1-1-1')['status']
+    assert throttling.get_metrics()['charge']['state'] == 'open'
+
+
+def test_rate_limit_caps_throughput(paystack_server, settings):
+    settings.PAYSTACK_RATE_LIMITS = {**settings.PAYSTACK_RATE_LIMITS, 'verify': 20}
+    paystack = Paystack()
+    references = [f'PAY-1-{idx}' for idx in range(30)]
+
+    started_at = time.perf_counter()
+    results = Dispatcher(max_workers=8).dispatch(references, paystack.verify_transfer)
+    duration = time.perf_counter() - started_at
+
+    assert all(result['status'] for reference, result, error in results)
+    # The first 20 requests are a burst, the other 10 are spread over half a second.
+    assert duration >= 0.45
@@ -0,0 +1,114 @@
+import json
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from djmoney.money import Money
+import msgpack
+import pytest
+from rest_framework import renderers
+from rest_framework.utils.serializer_helpers import ReturnList
+
+from base.renderers import JSONRenderer, MessagePackRenderer
+
+from .. import factories as f
+
+
+def get_renderer_context(status=200, method='GET'):
+    return {'response': SimpleNamespace(status_code=status), 'request': SimpleNamespace(method=method),
+            'resource_name': 'transaction'}
+
+
+def get_rows(count):
+    now = timezone.now().replace(microsecond=123456)
+
+    return ReturnList([{'id': idx, 'reference': f'SAV-1-1-{idx}', 'amount': Decimal('1000.50'),
+                        'balance': Money('2500.25', 'NGN'), 'status': _('Success'), 'created_at': now,
+                        'payment_date': date(2021, 1, idx % 28 + 1), 'duration': timedelta(minutes=idx),
+                        'comments': 'Ọ̀dúnlámì ', 'user': {'id': idx, 'email': f'user{idx}@email.com'}}
+                       for idx in range(count)], serializer=None)
+
+
+def render_with_rest_framework(data, renderer_context):
+    envelope = JSONRenderer().get_envelope(data, renderer_context)
+
+    return renderers.JSONRenderer().render(envelope, None, renderer_context)
+
+
+def test_json_renderer_output_matches_the_rest_framework_encoder():
+    data = get_rows(3)
+    renderer_context = get_renderer_context()
+
+    assert JSONRenderer().render(data, None, renderer_context) == render_with_rest_framework(
+        ReturnList([{**row, 'balance': row['balance'].amount} for row in data], serializer=None),
+        renderer_context)
+
+
+def test_json_renderer_envelopes():
+    assert JSONRenderer().render({'detail': 'Not found.'}, None, get_renderer_context(404)) == (
+        b'{"success":false,"message":"transaction does not exist."}')
+    assert JSONRenderer().render({'email': ['This field is required.']}, None,
+                                 get_renderer_context(400, 'POST')) == (
+        b'{"success":false,"message":"Invalid input data.","errors":{"email":["This field is required."]}}')
+    assert JSONRenderer().render(None, None, get_renderer_context(204, 'DELETE')) == b''
+    assert JSONRenderer().render({'id': 1}, 'application/json; indent=4', get_renderer_context()) == (
+        b'{\n    "success": true,\n    "message": "transaction retrieved successfully.",\n'
+        b'    "data": {\n        "id": 1\n    }\n}')
+
+
+@pytest.mark.benchmark
+def test_json_renderer_is_faster_than_the_rest_framework_encoder():
+    # Serializers return dates and decimals as strings.
+    data = ReturnList([{'id': idx, 'reference': f'SAV-1-1-{idx}', 'amount': '1000.50', 'amount_currency': 'NGN',
+                        'type': 'savings', 'status': 'success', 'comments': '', 'user': idx,
+                        'created_at': '2021-01-01T10:00:00.123456Z', 'updated_at': '2021-01-01T10:00:00.123456Z'}
+                       for idx in range(10000)], serializer=None)
+    renderer_context = get_renderer_context()
+
+    started_at = time.perf_counter()
+    fast = JSONRenderer().render(data, None, renderer_context)
+    fast_time = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    slow = render_with_rest_framework(data, renderer_context)
+    slow_time = time.perf_counter() - started_at
+
+    assert fast == slow
+    assert fast_time < slow_time
+
+
+@pytest.mark.django_db
+def test_msgpack_responses_have_the_json_envelope(client):
+    group = f.GroupFactory(is_searchable=True)
+    url = reverse('groups-detail', kwargs={'pk': group.id})
+
+    response = client.get(url, HTTP_ACCEPT='application/msgpack')
+
+    assert response['Content-Type'] == 'application/msgpack'
+    assert msgpack.unpackb(response.content) == client.get(url).json()
+    assert len(response.content) < len(client.get(url).content)
+
+
+@pytest.mark.django_db
+def test_msgpack_requests_are_parsed(client):
+    data = {'first_name': 'John', 'last_name': 'Doe', 'email': 'johndoe@email.com', 'password': 'Password123'}
+
+    response = client.post(reverse('auth-register'), msgpack.packb(data), content_type='application/msgpack',
+                            HTTP_ACCEPT='application/msgpack')
+    invalid_response = client.post(reverse('auth-register'), b'\xc1', content_type='application/msgpack')
+
+    assert response.status_code == 201
+    assert msgpack.unpackb(response.content)['data']['email'] == 'johndoe@email.com'
+    assert invalid_response.status_code == 400
+
+
+def test_msgpack_renderer_encodes_values_like_the_json_renderer():
+    data = get_rows(3)
+    renderer_context = get_renderer_context()
+
+    assert msgpack.unpackb(MessagePackRenderer().render(data, None, renderer_context)) == json.loads(
+        JSONRenderer().render(data, None, renderer_context))
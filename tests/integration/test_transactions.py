@@ -0,0 +1,591 @@
+from datetime import date, timedelta
+from io import StringIO
+from threading import Thread
+import json
+import os
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+import pytest
+
+from groups.models import Cycle
+from transactions import services
+from transactions.models import PaymentList, Run, RunItem, SavingsList, Transaction, WebhookEvent
+
+from .. import factories as f
+
+
+pytestmark = pytest.mark.django_db
+
+
+def create_saving_group(member_count):
+    group = f.GroupFactory(max_capacity=member_count, amount_to_save=1000)
+
+    for _ in range(member_count):
+        membership = f.MembershipFactory(group=group)
+        f.CardFactory(user=membership.user)
+
+    return f.CycleFactory(group=group)
+
+
+def run_worker():
+    out = StringIO()
+    call_command('run_worker', once=True, stdout=out)
+
+    return out.getvalue()
+
+
+def test_save_charges_members_due_today(client, paystack):
+    cycle = create_saving_group(3)
+    url = reverse('transactions-save')
+
+    client.login(cycle.group.owner)
+    response = client.get(url)
+    run_worker()
+
+    assert response.status_code == 202
+    assert paystack.charge_authorization.call_count == 3
+    assert Transaction.objects.filter(type=Transaction.SAVINGS).count() == 3
+    assert SavingsList.objects.filter(cycle=cycle).count() == 3
+
+    cycle.refresh_from_db()
+
+    assert cycle.next_saving_date == date.today() + timedelta(days=7)
+
+
+def test_save_moves_cycles_without_members_to_their_next_saving_date(client, paystack):
+    cycle = f.CycleFactory()
+    # The members of the cycle left after its end date was set.
+    Cycle.objects.filter(id=cycle.id).update(end_date=date.today() + timedelta(days=28))
+
+    client.login(cycle.group.owner)
+    client.get(reverse('transactions-save'))
+    run_worker()
+
+    cycle.refresh_from_db()
+
+    assert not RunItem.objects.exists()
+    assert cycle.next_saving_date == date.today() + timedelta(days=7)
+
+
+def test_save_charges_default_card(client, paystack):
+    cycle = create_saving_group(1)
+    user = cycle.group.memberships.get().user
+    card = f.CardFactory(user=user, is_default=True)
+    f.CardFactory(user=user)
+    url = reverse('transactions-save')
+
+    client.login(user)
+    client.get(url)
+    run_worker()
+
+    charged_authorization_code = paystack.charge_authorization.call_args[0][1]
+
+    assert charged_authorization_code == card.authorization_code
+
+
+def test_save_skips_members_without_cards(client, paystack, caplog):
+    cycle = create_saving_group(2)
+    membership = f.MembershipFactory(group=cycle.group)
+    url = reverse('transactions-save')
+
+    client.login(cycle.group.owner)
+    client.get(url)
+    run_worker()
+
+    item = RunItem.objects.get(user=membership.user)
+
+    assert SavingsList.objects.filter(cycle=cycle).count() == 2
+    assert item.status == RunItem.FAILED
+    assert f'Run item {item.reference} failed: No card found.' in caplog.messages
+
+
+def test_save_clears_next_saving_date_on_last_saving_day(client, paystack):
+    cycle = create_saving_group(1)
+    Cycle.objects.filter(id=cycle.id).update(end_date=date.today())
+    url = reverse('transactions-save')
+
+    client.login(cycle.group.owner)
+    client.get(url)
+    run_worker()
+
+    cycle.refresh_from_db()
+
+    assert cycle.next_saving_date is None
+
+
+def test_save_query_count_does_not_grow_with_members(client, paystack):
+    user = f.UserFactory()
+    url = reverse('transactions-save')
+    client.login(user)
+
+    create_saving_group(2)
+    client.get(url)
+
+    with CaptureQueriesContext(connection) as small_run:
+        run_worker()
+
+    create_saving_group(10)
+    create_saving_group(10)
+    client.get(url)
+
+    with CaptureQueriesContext(connection) as large_run:
+        run_worker()
+
+    assert SavingsList.objects.count() == 22
+    assert len(large_run) == len(small_run)
+
+
+def test_save_rerun_does_not_charge_members_twice(client, paystack):
+    create_saving_group(3)
+    url = reverse('transactions-save')
+
+    client.login(f.UserFactory())
+    client.get(url)
+    run_worker()
+    client.get(url)
+    run_worker()
+
+    assert paystack.charge_authorization.call_count == 3
+    assert Run.objects.filter(type=Run.SAVINGS, status=Run.COMPLETED).count() == 2
+
+
+def test_interrupted_savings_run_resumes_pending_items(paystack, settings):
+    cycle = create_saving_group(4)
+    unreachable_user = cycle.group.memberships.order_by('id').last().user
+    charge = paystack.charge_authorization.side_effect
+
+    def flaky_charge(self, authorization_code, email, amount, reference=None):
+        if email == unreachable_user.email:
+            raise ConnectionError('Connection reset by peer.')
+        return charge(self, authorization_code, email, amount, reference)
+
+    paystack.charge_authorization.side_effect = flaky_charge
+    run = services.run_savings(date.today(), chunk_size=2)
+
+    assert run.status == Run.RUNNING
+    assert run.items.filter(status=RunItem.COMPLETED).count() == 3
+    assert run.items.get(status=RunItem.PENDING).user == unreachable_user
+
+    # The pending item can be claimed again once its claim expires.
+    settings.RUN_LEASE_TIMEOUT = 0
+    paystack.charge_authorization.side_effect = charge
+    resumed_run = services.run_savings(date.today(), chunk_size=2)
+
+    assert resumed_run.id == run.id
+    assert paystack.charge_authorization.call_count == 5
+    assert run.items.filter(status=RunItem.COMPLETED).count() == 4
+    assert SavingsList.objects.filter(cycle=cycle).count() == 4
+
+    run.refresh_from_db()
+
+    assert run.status == Run.COMPLETED
+
+
+def test_resumed_item_recovers_earlier_charge(paystack):
+    create_saving_group(1)
+    paystack.charge_authorization.side_effect = None
+    paystack.charge_authorization.return_value = {
+        'status': False, 'message': 'Duplicate Transaction Reference'}
+    paystack.verify_transaction.side_effect = lambda self, reference: {
+        'status': True, 'message': 'Verification successful',
+        'data': {'amount': 1000000, 'reference': reference, 'status': 'success'}}
+
+    run = services.run_savings(date.today())
+    item = run.items.get()
+
+    assert item.status == RunItem.COMPLETED
+    assert item.transaction.reference == item.reference
+
+
+def post_charge_event(client, item, status='success'):
+    client.login(item.user)
+
+    return client.post(reverse('transactions-webhook'), {
+        'event': f'charge.{status}',
+        'data': {'amount': 100000, 'reference': item.reference, 'status': status}}, format='json')
+
+
+def apply_webhooks():
+    out = StringIO()
+    call_command('run_webhooks', once=True, stdout=out)
+
+    return out.getvalue()
+
+
+def test_webhook_queues_events_until_they_are_applied(client):
+    transactions = [f.TransactionFactory(reference=f'REF-{idx}', status='pending') for idx in range(3)]
+    client.login(transactions[0].user)
+    url = reverse('transactions-webhook')
+
+    for event, reference, status in [('charge.success', 'REF-0', 'success'), ('charge.success', 'REF-0', 'success'),
+                                     ('charge.failed', 'REF-1', 'failed'), ('refund.processed', 'REF-1', 'reversed'),
+                                     ('charge.success', 'REF-9', 'success')]:
+        response = client.post(url, {'event': event, 'data': {'amount': 100000, 'reference': reference,
+                                                              'status': status}}, format='json')
+
+        assert response.status_code == 200
+
+    assert WebhookEvent.objects.filter(processed_at__isnull=True).count() == 5
+    assert set(Transaction.objects.values_list('status', flat=True)) == {'pending'}
+
+    with CaptureQueriesContext(connection) as queries:
+        output = apply_webhooks()
+
+    updates = [query['sql'] for query in queries.captured_queries
+               if query['sql'].startswith('UPDATE "transactions_transaction"')
+               or query['sql'].startswith('UPDATE transactions_transaction')]
+
+    assert output == 'Applied 5 webhook events.\n'
+    assert len(updates) == 1
+    assert 'FROM (VALUES' in updates[0]
+    assert dict(Transaction.objects.values_list('reference', 'status')) == {
+        'REF-0': 'success', 'REF-1': 'reversed', 'REF-2': 'pending'}
+    assert not WebhookEvent.objects.filter(processed_at__isnull=True).exists()
+    assert apply_webhooks() == ''
+
+
+def test_upsert_updates_transactions_with_the_same_reference():
+    existing = f.TransactionFactory(reference='REF-0', status='pending')
+    transactions = [Transaction(reference=reference, amount=1000, type=Transaction.SAVINGS, status='success',
+                                user=existing.user) for reference in ['REF-0', 'REF-1']]
+
+    Transaction.objects.upsert(transactions)
+    Transaction.objects.upsert(transactions)
+
+    assert transactions[0].pk == existing.pk
+    assert Transaction.objects.get(pk=transactions[1].pk).amount.amount == 1000
+    assert dict(Transaction.objects.values_list('reference', 'status')) == {'REF-0': 'success', 'REF-1': 'success'}
+
+
+@pytest.mark.benchmark
+def test_webhooks_update_transactions_by_the_reference_index(client):
+    # Set BENCHMARK_TRANSACTIONS, e.g. to 10000000, to check the plan with more transactions.
+    count = int(os.environ.get('BENCHMARK_TRANSACTIONS', 200000))
+    user = f.UserFactory()
+    client.login(user)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO transactions_transaction (created_at, updated_at, reference, amount, amount_currency, '
+            "type, status, comments, user_id) SELECT now(), now(), 'BENCH-' || i, 1000, 'NGN', 'savings', "
+            "'pending', '', %s FROM generate_series(1, %s) AS i", [user.id, count])
+        cursor.execute('ANALYZE transactions_transaction')
+
+    references = [f'BENCH-{idx}' for idx in range(1, count + 1, max(count // 50, 1))]
+
+    for reference in references:
+        client.post(reverse('transactions-webhook'), {
+            'event': 'charge.success', 'data': {'amount': 100000, 'reference': reference,
+                                                'status': 'success'}}, format='json')
+
+    with CaptureQueriesContext(connection) as queries:
+        apply_webhooks()
+
+    update = next(query['sql'] for query in queries.captured_queries
+                  if query['sql'].startswith('UPDATE transactions_transaction'))
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN {update}')
+        plan = '\n'.join(row[0] for row in cursor.fetchall())
+
+    assert 'Seq Scan on transactions_transaction' not in plan
+    assert 'transactions_transaction_reference' in plan
+    assert Transaction.objects.filter(status='success').count() == len(references)
+
+
+def test_reconcile_transactions_verifies_stale_pending_transactions(paystack):
+    statuses = {'SAV-1': 'success', 'PAY-1': 'failed', 'SAV-3': 'ongoing'}
+    paystack.verify_transaction.side_effect = paystack.verify_transfer.side_effect = lambda self, reference: {
+        'status': reference in statuses, 'message': 'Verification successful',
+        'data': {'reference': reference, 'status': statuses.get(reference)}}
+    f.TransactionFactory(reference='SAV-0', status='success')
+    f.TransactionFactory(reference='SAV-1', status='pending')
+    f.TransactionFactory(reference='PAY-1', status='pending', type=Transaction.PAYMENT)
+    f.TransactionFactory(reference='SAV-2', status='pending')
+    f.TransactionFactory(reference='SAV-3', status='pending')
+    Transaction.objects.update(updated_at=timezone.now() - timedelta(hours=2))
+    f.TransactionFactory(reference='SAV-4', status='pending')
+    out = StringIO()
+
+    call_command('reconcile_transactions', chunk_size=2, stdout=out)
+
+    assert sorted(call[0][1] for call in paystack.verify_transaction.call_args_list) == ['SAV-1', 'SAV-2', 'SAV-3']
+    assert [call[0][1] for call in paystack.verify_transfer.call_args_list] == ['PAY-1']
+    assert dict(Transaction.objects.values_list('reference', 'status')) == {
+        'SAV-0': 'success', 'SAV-1': 'success', 'PAY-1': 'failed', 'SAV-2': 'pending', 'SAV-3': 'pending',
+        'SAV-4': 'pending'}
+    assert out.getvalue().splitlines()[:3] == [
+        'Checked 2 pending transactions, 2 updated so far.',
+        'Checked 4 pending transactions, 2 updated so far.',
+        'Checked 4 pending transactions, 2 updated.']
+
+
+def test_reconcile_transactions_stops_after_the_time_limit(paystack):
+    for idx in range(3):
+        f.TransactionFactory(reference=f'SAV-{idx}', status='pending')
+
+    assert services.reconcile_transactions(older_than=0, chunk_size=2, time_limit=0) == (2, 0)
+    assert paystack.verify_transaction.call_count == 2
+
+
+def test_bulk_charge_logs_members_without_cards(paystack, settings, caplog):
+    settings.PAYSTACK_BULK_CHARGE = True
+    cycle = create_saving_group(1)
+    membership = f.MembershipFactory(group=cycle.group)
+
+    call_command('run_savings', stdout=StringIO())
+
+    item = RunItem.objects.get(user=membership.user)
+
+    assert item.status == RunItem.FAILED
+    assert f'Run item {item.reference} failed: No card found.' in caplog.messages
+
+
+def test_bulk_charge_results_are_reconciled_from_the_webhook(client, paystack, settings):
+    settings.PAYSTACK_BULK_CHARGE = True
+    settings.PAYSTACK_BULK_CHARGE_LIMIT = 2
+    cycle = create_saving_group(3)
+
+    call_command('run_savings', stdout=StringIO())
+
+    assert [len(call[0][1]) for call in paystack.bulk_charge.call_args_list] == [2, 1]
+    assert not paystack.charge_authorization.called
+    assert RunItem.objects.filter(status=RunItem.SUBMITTED).count() == 3
+    assert Run.objects.get().status == Run.RUNNING
+
+    first_item, second_item, third_item = RunItem.objects.all()
+    post_charge_event(client, first_item)
+    post_charge_event(client, first_item)
+    post_charge_event(client, second_item, status='failed')
+    apply_webhooks()
+
+    assert Run.objects.get().status == Run.RUNNING
+
+    response = post_charge_event(client, third_item)
+    apply_webhooks()
+    cycle.refresh_from_db()
+
+    assert response.status_code == 200
+    assert list(RunItem.objects.values_list('status', flat=True)) == [
+        RunItem.COMPLETED, RunItem.FAILED, RunItem.COMPLETED]
+    assert SavingsList.objects.filter(cycle=cycle).count() == 2
+    assert Transaction.objects.get(reference=first_item.reference).amount.amount == 1000
+    assert Run.objects.get().status == Run.COMPLETED
+    assert cycle.next_saving_date == date.today() + timedelta(days=7)
+
+
+def test_submitted_charges_are_verified_when_their_claim_expires(paystack, settings):
+    settings.PAYSTACK_BULK_CHARGE = True
+    create_saving_group(3)
+    call_command('run_savings', stdout=StringIO())
+    first_item, second_item, third_item = RunItem.objects.all()
+    statuses = {first_item.reference: 'success', second_item.reference: 'ongoing'}
+    paystack.verify_transaction.side_effect = lambda self, reference: {
+        'status': reference in statuses, 'message': 'Verification successful',
+        'data': {'amount': 100000, 'reference': reference, 'status': statuses.get(reference)}}
+
+    RunItem.objects.update(claimed_at=timezone.now() - timedelta(seconds=settings.RUN_LEASE_TIMEOUT))
+    call_command('run_savings', stdout=StringIO())
+
+    assert paystack.bulk_charge.call_count == 2
+    assert [charge['reference'] for charge in paystack.bulk_charge.call_args[0][1]] == [third_item.reference]
+    assert list(RunItem.objects.values_list('status', flat=True)) == [
+        RunItem.COMPLETED, RunItem.SUBMITTED, RunItem.SUBMITTED]
+    assert SavingsList.objects.count() == 1
+
+
+def test_pay_transfers_due_payments_once(client, paystack, caplog):
+    cycle = create_saving_group(3)
+    payments = PaymentList.objects.bulk_create(
+        [PaymentList(order=idx + 1, group=cycle.group, cycle=cycle, payment_date=date.today(),
+                     user=membership.user) for idx, membership in enumerate(cycle.group.memberships.all())])
+    f.BankFactory(user=payments[0].user)
+    f.BankFactory(user=payments[1].user)
+    url = reverse('transactions-pay')
+
+    client.login(cycle.group.owner)
+    response = client.get(url)
+    run_worker()
+    client.get(url)
+    run_worker()
+
+    assert response.status_code == 202
+    assert paystack.bulk_transfers.call_count == 1
+    assert Transaction.objects.filter(type=Transaction.PAYMENT).count() == 2
+    # Transfers Paystack received are pending until they are reconciled.
+    assert Transaction.objects.filter(type=Transaction.PAYMENT, status=Transaction.PENDING).count() == 2
+    assert PaymentList.objects.filter(transaction__isnull=False).count() == 2
+    transfers = paystack.bulk_transfers.call_args[0][1]
+    assert [transfer['amount'] for transfer in transfers] == [1000 * 3 * 100] * 2
+    for item in RunItem.objects.filter(payment=payments[2]):
+        assert f'Run item {item.reference} failed: No bank found.' in caplog.messages
+
+
+def create_due_payments(member_count):
+    cycle = create_saving_group(member_count)
+    payments = PaymentList.objects.bulk_create(
+        [PaymentList(order=idx + 1, group=cycle.group, cycle=cycle, payment_date=date.today(),
+                     user=membership.user) for idx, membership in enumerate(cycle.group.memberships.all())])
+
+    for payment in payments:
+        f.BankFactory(user=payment.user)
+
+    return payments
+
+
+def test_payouts_are_chunked_to_the_bulk_transfer_limit(paystack, settings):
+    settings.PAYSTACK_BULK_TRANSFER_LIMIT = 2
+    payments = create_due_payments(5)
+
+    call_command('run_payouts', stdout=StringIO())
+
+    assert [len(call[0][1]) for call in paystack.bulk_transfers.call_args_list] == [2, 2, 1]
+    assert not paystack.initiate_transfer.called
+    for payment in PaymentList.objects.select_related('transaction'):
+        assert payment.transaction.reference == RunItem.objects.get(payment=payment).reference
+    assert Transaction.objects.filter(type=Transaction.PAYMENT).count() == len(payments)
+
+
+def test_rejected_bulk_transfer_recovers_earlier_transfers(paystack):
+    payments = create_due_payments(2)
+    paystack.bulk_transfers.side_effect = None
+    paystack.bulk_transfers.return_value = {'status': False, 'message': 'Duplicate Transfer Reference'}
+    paystack.verify_transfer.side_effect = lambda self, reference: {
+        'status': reference.endswith(f'-{payments[0].id}'), 'message': 'Transfer retrieved',
+        'data': {'reference': reference, 'amount': 600000, 'status': 'success'}}
+
+    call_command('run_payouts', stdout=StringIO())
+
+    item, other_item = RunItem.objects.order_by('payment__order')
+    assert item.status == RunItem.COMPLETED
+    assert item.transaction.reference == item.reference
+    assert other_item.status == RunItem.FAILED
+    assert other_item.comments == 'Duplicate Transfer Reference'
+
+
+def test_save_queues_a_single_run_per_day(client, paystack):
+    url = reverse('transactions-save')
+
+    client.login(f.UserFactory())
+    response = client.get(url)
+    run_id = json.loads(response.content)['data']['id']
+    response = client.get(url)
+
+    assert json.loads(response.content)['data']['id'] == run_id
+    assert Run.objects.get(id=run_id).status == Run.QUEUED
+
+
+def test_retrieve_run_progress(client, paystack):
+    create_saving_group(3)
+    user = f.UserFactory()
+
+    client.login(user)
+    response = client.get(reverse('transactions-save'))
+    run_id = json.loads(response.content)['data']['id']
+    run_worker()
+
+    response = client.get(reverse('transactions-run', kwargs={'run_id': run_id}))
+    response_data = json.loads(response.content)['data']
+
+    assert response.status_code == 200
+    assert response_data['status'] == Run.COMPLETED
+    assert response_data['progress'] == {'total': 3, 'pending': 0, 'submitted': 0,
+                                         'completed': 3, 'failed': 0}
+
+
+def test_workers_claim_different_run_items(paystack):
+    create_saving_group(3)
+    run = services.claim_run(services.enqueue_run(Run.SAVINGS, date.today()))
+
+    first_chunk = services.claim_run_items(run, 2)
+    second_chunk = services.claim_run_items(run, 2)
+
+    assert len(first_chunk) == 2
+    assert len(second_chunk) == 1
+    assert not {item.id for item in first_chunk} & {item.id for item in second_chunk}
+    assert services.claim_run_items(run, 2) == []
+    assert services.claim_run() is None
+
+
+def test_workers_claim_run_items_with_an_expired_claim(paystack, settings):
+    create_saving_group(1)
+    run = services.claim_run(services.enqueue_run(Run.SAVINGS, date.today()))
+    item, = services.claim_run_items(run, 10)
+    settings.RUN_LEASE_TIMEOUT = 0
+
+    assert services.claim_run_items(run, 10) == [item]
+
+
+def test_expired_claim_results_are_not_saved_twice(paystack, settings):
+    create_saving_group(1)
+    run = services.claim_run(services.enqueue_run(Run.SAVINGS, date.today()))
+    paystack_client = services.Paystack()
+    dispatcher = services.Dispatcher(max_workers=1)
+    settings.RUN_LEASE_TIMEOUT = 0
+    slow_worker_items = services.claim_run_items(run, 10)
+    fast_worker_items = services.claim_run_items(run, 10)
+
+    services.process_savings_items(fast_worker_items, paystack_client, dispatcher)
+    services.process_savings_items(slow_worker_items, paystack_client, dispatcher)
+
+    assert Transaction.objects.count() == 1
+    assert SavingsList.objects.count() == 1
+
+
+def test_shards_split_run_items_by_group(paystack):
+    for _ in range(4):
+        create_saving_group(2)
+
+    run = services.claim_run(services.enqueue_run(Run.SAVINGS, date.today()))
+    shards = [services.claim_run_items(run, 100, shard=(index, 2)) for index in range(2)]
+
+    assert len(shards[0]) + len(shards[1]) == 8
+    assert all(item.group_id % 2 == 0 for item in shards[0])
+    assert all(item.group_id % 2 == 1 for item in shards[1])
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_workers_charge_each_member_once(paystack):
+    groups = [create_saving_group(5).group for _ in range(6)]
+    errors = []
+
+    def work(shard):
+        try:
+            run = services.claim_run(services.enqueue_run(Run.SAVINGS, date.today()))
+            services.process_run(run, chunk_size=3, shard=shard)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    workers = [Thread(target=work, args=(shard,))
+               for shard in [None, None, (0, 2), (1, 2)]]
+
+    for worker in workers:
+        worker.start()
+
+    for worker in workers:
+        worker.join()
+
+    charged_emails = [call[0][2] for call in paystack.charge_authorization.call_args_list]
+
+    assert errors == []
+    assert len(charged_emails) == len(set(charged_emails)) == 30
+    assert SavingsList.objects.filter(group__in=groups).count() == 30
+    assert Run.objects.get().status == Run.COMPLETED
+
+
+def test_run_savings_command_outputs_progress(paystack):
+    create_saving_group(3)
+    out = StringIO()
+
+    call_command('run_savings', chunk_size=2, stdout=out)
+
+    assert 'processed 2/3 items' in out.getvalue()
+    assert 'processed 3/3 items' in out.getvalue()
+    assert SavingsList.objects.count() == 3
@@ -0,0 +1,194 @@
+import json
+import re
+import ssl
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from secrets import token_hex
+from urllib.parse import parse_qs, urlparse
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Allow many concurrent connections without the client retrying to connect.
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        # Clients that time out close the connection before the response is sent.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakePaystackServer():
+    """
+    A local HTTP server that imitates the parts of the Paystack API used by the app.
+
+    Every request is recorded in `requests` as a `(method, path, data)` tuple.
+    `latency` is the number of seconds the server waits before responding to a request.
+    `failures` is the number of requests to respond to with `failure_status` before
+    responding normally. The server uses TLS if a `certfile` is given.
+    """
+
+    def __init__(self, latency=0, certfile=None):
+        self.latency = latency
+        self.failures = 0
+        self.failure_status = 503
+        self.connections = 0
+        self.requests = []
+        self.lock = threading.Lock()
+        self.server = _Server(('127.0.0.1', 0), self.get_handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.scheme = 'https' if certfile else 'http'
+
+        if certfile:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile)
+            self.server.socket = context.wrap_socket(self.server.socket, server_side=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+
+        return f'{self.scheme}://{host}:{port}'
+
+    def start(self):
+        self.thread.start()
+
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def requests_to(self, path):
+        """
+        Get the data of the requests made to `path`.
+        """
+        return [data for method, request_path, data in self.requests if request_path == path]
+
+    def respond(self, method, path, data):
+        with self.lock:
+            self.requests.append((method, path, data))
+
+        if path == '/bank/resolve':
+            return {'status': True, 'message': 'Account number resolved',
+                    'data': {'account_number': data['account_number'], 'account_name': 'JOHN DOE',
+                             'bank_id': 9}}
+
+        if path == '/transferrecipient':
+            return {'status': True, 'message': 'Transfer recipient created successfully',
+                    'data': {'recipient_code': f'RCP_{token_hex(8)}',
+                             'details': {'account_number': data['account_number'],
+                                         'account_name': data['name'],
+                                         'bank_code': data['bank_code'],
+                                         'bank_name': 'Test Bank'}}}
+
+        if path.startswith('/transaction/verify/'):
+            reference = path.rsplit('/', 1)[-1]
+            return {'status': True, 'message': 'Verification successful',
+                    'data': {'reference': reference, 'status': 'success', 'amount': 5000,
+                             'authorization': {'authorization_code': f'AUTH_{token_hex(5)}',
+                                               'bin': '408408', 'last4': '4081', 'exp_month': '12',
+                                               'exp_year': '2030', 'channel': 'card', 'card_type': 'visa',
+                                               'bank': 'TEST BANK', 'country_code': 'NG',
+                                               'reusable': True, 'signature': f'SIG_{token_hex(6)}'}}}
+
+        if path.startswith('/transfer/verify/'):
+            reference = path.rsplit('/', 1)[-1]
+            return {'status': True, 'message': 'Transfer retrieved',
+                    'data': {'reference': reference, 'status': 'success', 'amount': 5000}}
+
+        if path == '/refund':
+            return {'status': True, 'message': 'Refund has been queued for processing',
+                    'data': {'transaction': {'reference': data['transaction']}, 'status': 'pending'}}
+
+        if path == '/transaction/charge_authorization':
+            return {'status': True, 'message': 'Charge attempted',
+                    'data': {'amount': int(data['amount']), 'reference': data.get('reference', token_hex(8)),
+                             'status': 'success'}}
+
+        if path == '/bulkcharge':
+            return {'status': True, 'message': 'Charges have been queued',
+                    'data': {'batch_code': f'BCH_{token_hex(6)}', 'total_charges': len(data),
+                             'pending_charges': len(data), 'status': 'active'}}
+
+        if path == '/transfer/bulk':
+            return {'status': True, 'message': f'{len(data["transfers"])} transfers queued.',
+                    'data': [{'amount': int(transfer['amount']), 'reference': transfer['reference'],
+                              'recipient': transfer['recipient'], 'transfer_code': f'TRF_{token_hex(6)}',
+                              'currency': data['currency'], 'status': 'received'}
+                             for transfer in data['transfers']]}
+
+        if path == '/transfer':
+            return {'status': True, 'message': 'Transfer has been queued',
+                    'data': {'amount': int(data['amount']), 'reference': data.get('reference', token_hex(8)),
+                             'transfer_code': f'TRF_{token_hex(6)}', 'status': 'pending'}}
+
+        return None
+
+    def get_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep connections alive between requests.
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+
+                with fake.lock:
+                    fake.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def get_data(self):
+                url = urlparse(self.path)
+                data = {key: value[0] for key, value in parse_qs(url.query).items()}
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length).decode() if length else ''
+
+                if body and 'json' in self.headers.get('Content-Type', ''):
+                    content = json.loads(body)
+                    return content if isinstance(content, list) else {**data, **content}
+
+                data.update({key: value[0] if len(value) == 1 else value
+                             for key, value in parse_qs(body).items()})
+                return data
+
+            def handle_request(self):
+                if fake.latency:
+                    time.sleep(fake.latency)
+
+                path = re.sub(r'/+$', '', urlparse(self.path).path)
+                data = self.get_data()
+
+                with fake.lock:
+                    failed = fake.failures > 0
+                    fake.failures -= failed
+
+                if failed:
+                    content, status = {'status': False, 'message': 'Request failed'}, fake.failure_status
+                else:
+                    content = fake.respond(self.command, path, data)
+                    status = 200 if content else 404
+
+                body = json.dumps(content or {'status': False, 'message': 'Not found'}).encode()
+
+                self.send_response(status)
+
+                if status == 429:
+                    self.send_header('Retry-After', '1')
+
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = handle_request
+            do_POST = handle_request
+            do_PUT = handle_request
+
+        return Handler
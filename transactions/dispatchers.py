@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+class Dispatcher():
+    """
+    Run provider calls over a bounded pool of threads.
+
+    Calls that share a key run one after the other in the order they were given,
+    while calls with different keys run in parallel.
+    """
+    max_workers = None
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or settings.PAYSTACK_MAX_CONCURRENCY
+
+    def dispatch(self, items, call, key=None):
+        """
+        Call `call` with each item in `items` and collect the results.
+
+        :param items: List of items to dispatch.
+        :param call: Callable that is passed a single item.
+        :param key: Callable that returns the ordering key of an item.
+                    Items are dispatched independently if no key is given.
+
+        :return: List of `(item, result, error)` tuples in the order of `items`.
+                 `error` is the exception raised by the call, if any.
+        """
+        queues = {}
+
+        for idx, item in enumerate(items):
+            queue_key = key(item) if key else idx
+            queues.setdefault(queue_key, []).append((idx, item))
+
+        results = [None] * len(items)
+
+        def run(queue):
+            for idx, item in queue:
+                try:
+                    results[idx] = (item, call(item), None)
+                except Exception as e:
+                    results[idx] = (item, None, e)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # Consume the iterator so exceptions raised outside `call` are not swallowed.
+            list(executor.map(run, queues.values()))
+
+        return results
@@ -0,0 +1,71 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from transactions import throttling
+from transactions.dispatchers import Dispatcher
+
+
+def add_shard_arguments(parser):
+    parser.add_argument('--shards', type=int,
+                        help='The number of workers the groups are split between.')
+    parser.add_argument('--shard', type=int,
+                        help='The index of the groups this worker processes, from 0 to --shards - 1.')
+
+
+def get_shard(options):
+    """
+    Get the `(index, count)` shard tuple from the command options.
+    """
+    if options['shards'] is None:
+        return None
+
+    if options['shard'] is None or not 0 <= options['shard'] < options['shards']:
+        raise CommandError('--shard must be between 0 and --shards - 1.')
+
+    return (options['shard'], options['shards'])
+
+
+def get_paystack_metrics():
+    """
+    Describe the state of the Paystack rate limits and circuits of this process.
+
+    :return: List of lines, one for each endpoint family.
+    """
+    return [f'Paystack {family} requests: {metrics["requests"]} made, {metrics["waits"]} delayed '
+            f'for {metrics["wait_time"]}s, {metrics["pauses"]} paused, circuit {metrics["state"]} '
+            f'({metrics["trips"]} trips, {metrics["rejected"]} rejected).'
+            for family, metrics in throttling.get_metrics().items()]
+
+
+class RunCommand(BaseCommand):
+    """
+    Base command for processing a savings or payment run in the foreground.
+
+    `run_function` is the service function that processes the run. It is passed the date
+    and the command options, and returns the run.
+    """
+    run_function = None
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=lambda value: datetime.strptime(value, '%Y-%m-%d').date(),
+                            help='The date to run for, in YYYY-MM-DD format. Defaults to today.')
+        parser.add_argument('--chunk-size', type=int,
+                            help='The number of items to process and save at a time.')
+        parser.add_argument('--concurrency', type=int,
+                            help='The maximum number of Paystack requests to make at the same time.')
+        add_shard_arguments(parser)
+
+    def handle(self, *args, **options):
+        date = options['date'] or datetime.now().date()
+        run = self.run_function(date, chunk_size=options['chunk_size'],
+                                dispatcher=Dispatcher(max_workers=options['concurrency']),
+                                progress=self.write_progress, shard=get_shard(options))
+
+        self.stdout.write(self.style.SUCCESS(f'{run} is {run.status}.'))
+
+        for line in get_paystack_metrics():
+            self.stdout.write(line)
+
+    def write_progress(self, run, processed, total):
+        self.stdout.write(f'{run}: processed {processed}/{total} items.')
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from transactions import services
+from transactions.dispatchers import Dispatcher
+
+from ._runs import get_paystack_metrics
+
+
+class Command(BaseCommand):
+    help = ('Verify the transactions that are still pending with Paystack and save their statuses, '
+            'e.g. after a webhook was lost.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int,
+                            help='The number of seconds a transaction must have been pending for. '
+                                 'Defaults to RECONCILE_AFTER.')
+        parser.add_argument('--chunk-size', type=int,
+                            help='The number of transactions to verify and save at a time.')
+        parser.add_argument('--concurrency', type=int,
+                            help='The maximum number of Paystack requests to make at the same time.')
+        parser.add_argument('--time-limit', type=int,
+                            help='The number of seconds after which no new chunk is started.')
+
+    def handle(self, *args, **options):
+        checked, updated = services.reconcile_transactions(
+            older_than=options['older_than'], chunk_size=options['chunk_size'],
+            time_limit=options['time_limit'], dispatcher=Dispatcher(max_workers=options['concurrency']),
+            progress=self.write_progress)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} pending transactions, {updated} updated.'))
+
+        for line in get_paystack_metrics():
+            self.stdout.write(line)
+
+    def write_progress(self, checked, updated):
+        self.stdout.write(f'Checked {checked} pending transactions, {updated} updated so far.')
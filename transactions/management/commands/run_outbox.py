@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from transactions import services
+from transactions.dispatchers import Dispatcher
+from transactions.models import OutboxMessage
+
+
+class Command(BaseCommand):
+    help = ('Send the Paystack requests in the outbox, e.g. card refunds. '
+            'Several workers can drain the outbox at the same time, each claiming different messages.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once there are no messages left to send.')
+        parser.add_argument('--sleep', type=float, default=1,
+                            help='The number of seconds to wait before checking for new messages.')
+        parser.add_argument('--batch-size', type=int,
+                            help='The number of messages to send at a time.')
+        parser.add_argument('--concurrency', type=int,
+                            help='The maximum number of Paystack requests to make at the same time.')
+
+    def handle(self, *args, **options):
+        dispatcher = Dispatcher(max_workers=options['concurrency'])
+
+        while True:
+            messages = services.drain_outbox(batch_size=options['batch_size'], dispatcher=dispatcher)
+
+            if not messages:
+                if options['once']:
+                    return
+
+                time.sleep(options['sleep'])
+                continue
+
+            sent = sum(message.status == OutboxMessage.SENT for message in messages)
+            failed = sum(message.status == OutboxMessage.FAILED for message in messages)
+
+            self.stdout.write(f'Sent {sent} outbox messages, {failed} failed, '
+                              f'{len(messages) - sent - failed} will be retried.')
@@ -0,0 +1,8 @@
+from transactions import services
+
+from ._runs import RunCommand
+
+
+class Command(RunCommand):
+    help = 'Pay every member whose payment date is due, resuming an unfinished payment run.'
+    run_function = staticmethod(services.run_payouts)
@@ -0,0 +1,8 @@
+from transactions import services
+
+from ._runs import RunCommand
+
+
+class Command(RunCommand):
+    help = 'Charge every member of the cycles due for saving, resuming an unfinished savings run.'
+    run_function = staticmethod(services.run_savings)
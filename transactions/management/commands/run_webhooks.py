@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from transactions import services
+
+
+class Command(BaseCommand):
+    help = ('Apply the queued Paystack webhook events in batches. '
+            'Several consumers can run at the same time, each claiming different events.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once there are no events left to apply.')
+        parser.add_argument('--sleep', type=float, default=1,
+                            help='The number of seconds to wait before checking for new events.')
+        parser.add_argument('--batch-size', type=int,
+                            help='The number of events to apply at a time.')
+
+    def handle(self, *args, **options):
+        while True:
+            events = services.consume_webhook_events(batch_size=options['batch_size'])
+
+            if not events:
+                if options['once']:
+                    return
+
+                time.sleep(options['sleep'])
+                continue
+
+            self.stdout.write(f'Applied {len(events)} webhook events.')
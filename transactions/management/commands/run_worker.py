@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from transactions import services
+from transactions.dispatchers import Dispatcher
+
+from ._runs import add_shard_arguments, get_paystack_metrics, get_shard
+
+
+class Command(BaseCommand):
+    help = ('Process savings and payment runs. '
+            'Several workers can process a run at the same time, each claiming different items.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once there are no runs left to claim.')
+        parser.add_argument('--sleep', type=float, default=5,
+                            help='The number of seconds to wait before checking for new runs.')
+        parser.add_argument('--chunk-size', type=int,
+                            help='The number of items to process and save at a time.')
+        parser.add_argument('--concurrency', type=int,
+                            help='The maximum number of Paystack requests to make at the same time.')
+        add_shard_arguments(parser)
+
+    def handle(self, *args, **options):
+        dispatcher = Dispatcher(max_workers=options['concurrency'])
+        shard = get_shard(options)
+
+        while True:
+            run = services.claim_run(shard=shard)
+
+            if not run:
+                if options['once']:
+                    return
+
+                time.sleep(options['sleep'])
+                continue
+
+            self.stdout.write(f'Processing {run}.')
+            run = services.process_run(run, chunk_size=options['chunk_size'], dispatcher=dispatcher,
+                                       progress=self.write_progress, shard=shard)
+            self.stdout.write(self.style.SUCCESS(f'{run} is {run.status}.'))
+
+            for line in get_paystack_metrics():
+                self.stdout.write(line)
+
+    def write_progress(self, run, processed, total):
+        self.stdout.write(f'{run}: processed {processed}/{total} items.')
@@ -0,0 +1,54 @@
+# Generated by Django 3.2.25 on 2026-10-18 14:13
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('groups', '0005_alter_cycle_end_date'),
+        ('transactions', '0009_paymentlist_transaction'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Run',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('type', models.CharField(choices=[('savings', 'Savings'), ('payment', 'Payment')], max_length=128, verbose_name='run type')),
+                ('date', models.DateField(verbose_name='run date')),
+                ('status', models.CharField(choices=[('running', 'Running'), ('completed', 'Completed')], default='running', max_length=128, verbose_name='run status')),
+                ('completed_at', models.DateTimeField(blank=True, null=True, verbose_name='completed at')),
+            ],
+            options={
+                'ordering': ['-created_at', '-updated_at'],
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='RunItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('reference', models.CharField(max_length=255, unique=True, verbose_name='transaction reference')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=128, verbose_name='item status')),
+                ('comments', models.TextField(blank=True, default='', verbose_name='comments')),
+                ('cycle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='run_items', to='groups.cycle')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='run_items', to='groups.group')),
+                ('payment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='run_items', to='transactions.paymentlist')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='transactions.run')),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='run_items', to='transactions.transaction')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='run_items', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('id',),
+                'unique_together': {('run', 'cycle', 'user')},
+            },
+        ),
+    ]
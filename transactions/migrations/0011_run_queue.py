@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-18 14:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0010_run_runitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='run',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='heartbeat at'),
+        ),
+        migrations.AlterField(
+            model_name='run',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed')], default='queued', max_length=128, verbose_name='run status'),
+        ),
+    ]
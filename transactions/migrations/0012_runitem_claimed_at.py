@@ -0,0 +1,26 @@
+# Generated by Django 3.2.25 on 2026-10-18 14:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0011_run_queue'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='run',
+            name='heartbeat_at',
+        ),
+        migrations.AddField(
+            model_name='runitem',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='claimed at'),
+        ),
+        migrations.AddIndex(
+            model_name='runitem',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['run', 'id'], name='transaction_runitem_pending'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.25 on 2026-10-18 14:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0012_runitem_claimed_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='runitem',
+            name='transaction_runitem_pending',
+        ),
+        migrations.AlterField(
+            model_name='runitem',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('submitted', 'Submitted'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=128, verbose_name='item status'),
+        ),
+        migrations.AddIndex(
+            model_name='runitem',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'submitted'])), fields=['run', 'id'], name='transaction_runitem_open'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.25 on 2026-10-18 14:44
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0013_runitem_submitted'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('action', models.CharField(choices=[('refund', 'Refund')], max_length=128, verbose_name='action')),
+                ('payload', models.JSONField(default=dict, verbose_name='payload')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=128, verbose_name='message status')),
+                ('attempts', models.IntegerField(default=0, verbose_name='attempts')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='available at')),
+                ('comments', models.TextField(blank=True, default='', verbose_name='comments')),
+            ],
+            options={
+                'ordering': ('id',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='outboxmessage',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['available_at'], name='transaction_outbox_pending'),
+        ),
+    ]
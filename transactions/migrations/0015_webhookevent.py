@@ -0,0 +1,32 @@
+# Generated by Django 3.2.25 on 2026-10-18 14:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0014_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('event', models.CharField(max_length=255, verbose_name='event')),
+                ('reference', models.CharField(max_length=255, verbose_name='transaction reference')),
+                ('data', models.JSONField(default=dict, verbose_name='data')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='processed at')),
+            ],
+            options={
+                'ordering': ('id',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='webhookevent',
+            index=models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['id'], name='transaction_webhook_pending'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 3.2.25 on 2026-10-18 14:51
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def rename_duplicate_references(apps, schema_editor):
+    # Keep the first transaction with each reference and suffix the others with their id,
+    # so the unique index can be created without losing transactions.
+    Transaction = apps.get_model('transactions', 'Transaction')
+    max_length = Transaction._meta.get_field('reference').max_length
+    duplicates = list(Transaction.objects.values('reference').annotate(
+        count=Count('id')).filter(count__gt=1).values_list('reference', flat=True))
+
+    for reference in duplicates:
+        for transaction in Transaction.objects.filter(reference=reference).order_by('id')[1:]:
+            suffix = f'-{transaction.id}'
+            attempt = 0
+
+            # Shorten the reference so the suffix fits, and count up if another transaction
+            # already has the new reference.
+            while True:
+                new_reference = f'{reference[:max_length - len(suffix)]}{suffix}'
+
+                if not Transaction.objects.filter(reference=new_reference).exists():
+                    break
+
+                attempt += 1
+                suffix = f'-{transaction.id}-{attempt}'
+
+            transaction.reference = new_reference
+            transaction.save(update_fields=['reference'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0015_webhookevent'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicate_references, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='card',
+            name='reference',
+            field=models.CharField(db_index=True, max_length=255, verbose_name='transaction reference'),
+        ),
+        migrations.AlterField(
+            model_name='transaction',
+            name='reference',
+            field=models.CharField(max_length=255, unique=True, verbose_name='transaction reference'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 14:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0016_transaction_reference_unique'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['id'], name='transaction_pending'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0017_transaction_pending'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bank',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='bank_user_created'),
+        ),
+        migrations.AddIndex(
+            model_name='card',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='card_user_created'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentlist',
+            index=models.Index(fields=['group', 'order', 'id'], name='payment_group_order'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentlist',
+            index=models.Index(fields=['cycle', 'order', 'id'], name='payment_cycle_order'),
+        ),
+        migrations.AddIndex(
+            model_name='savingslist',
+            index=models.Index(fields=['group', 'created_at', 'id'], name='savings_group_created'),
+        ),
+        migrations.AddIndex(
+            model_name='savingslist',
+            index=models.Index(fields=['cycle', 'created_at', 'id'], name='savings_cycle_created'),
+        ),
+    ]
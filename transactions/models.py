@@ -1,5 +1,8 @@
-from django.db import models
+from itertools import chain
+
+from django.db import connection, models
 from django.conf import settings
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from djmoney.models.fields import MoneyField
@@ -22,13 +25,19 @@ class Bank(TimestampedModel):
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
                              on_delete=models.CASCADE, related_name='banks')
 
+    class Meta(TimestampedModel.Meta):
+        # Pages of the list of a user, see `base.pagination.KeysetPagination`.
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id'], name='bank_user_created'),
+        ]
+
     def __str__(self):
         return self.account_name
 
 
 class Card(TimestampedModel):
     reference = models.CharField(
-        max_length=255, verbose_name=_('transaction reference'))
+        max_length=255, db_index=True, verbose_name=_('transaction reference'))
     authorization_code = models.CharField(
         max_length=255, verbose_name=_('authorization code'))
     card_type = models.CharField(max_length=128, verbose_name=_('card type'))
@@ -47,10 +56,74 @@ class Card(TimestampedModel):
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
                              on_delete=models.CASCADE, related_name='cards')
 
+    class Meta(TimestampedModel.Meta):
+        # Pages of the list of a user, see `base.pagination.KeysetPagination`.
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id'], name='card_user_created'),
+        ]
+
     def __str__(self):
         return self.bank
 
 
+class TransactionManager(models.Manager):
+    def upsert(self, transactions, update_fields=('status', 'comments')):
+        """
+        Save transactions in bulk with a single `INSERT ... ON CONFLICT` query.
+
+        Transactions whose reference was already saved, e.g. by an earlier attempt, are updated
+        instead of being inserted again. The primary keys of the saved rows are set on `transactions`.
+
+        :param transactions: List of `Transaction` instances.
+        :param update_fields: The fields to update on transactions that already exist.
+        """
+        if not transactions:
+            return
+
+        fields = [field for field in self.model._meta.concrete_fields if not field.primary_key]
+        rows = {}
+
+        for obj in transactions:
+            rows[obj.reference] = [field.get_db_prep_save(field.pre_save(obj, True), connection)
+                                   for field in fields]
+
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        values = ', '.join([f'({", ".join(["%s"] * len(fields))})'] * len(rows))
+        updates = ', '.join(f'{column} = EXCLUDED.{column}' for column in (
+            connection.ops.quote_name(self.model._meta.get_field(name).column)
+            for name in [*update_fields, 'updated_at']))
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {self.model._meta.db_table} ({columns}) VALUES {values} '
+                f'ON CONFLICT (reference) DO UPDATE SET {updates} RETURNING reference, id',
+                list(chain.from_iterable(rows.values())))
+            ids = dict(cursor.fetchall())
+
+        for obj in transactions:
+            obj.pk = ids[obj.reference]
+            obj._state.adding = False
+            obj._state.db = self.db
+
+    def set_statuses(self, statuses):
+        """
+        Set the status of transactions by reference with a single `UPDATE ... FROM (VALUES ...)` query.
+
+        :param statuses: Dict mapping transaction references to their new status.
+        """
+        if not statuses:
+            return
+
+        values = ', '.join(['(%s, %s)'] * len(statuses))
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {self.model._meta.db_table} AS t SET status = v.status, updated_at = %s '
+                f'FROM (VALUES {values}) AS v(reference, status) '
+                f'WHERE t.reference = v.reference AND t.status <> v.status',
+                [timezone.now(), *chain.from_iterable(statuses.items())])
+
+
 class Transaction(TimestampedModel):
     SAVINGS = 'savings'
     PAYMENT = 'payment'
@@ -73,7 +146,7 @@ class Transaction(TimestampedModel):
     ]
 
     reference = models.CharField(
-        max_length=255, verbose_name=_('transaction reference'))
+        max_length=255, unique=True, verbose_name=_('transaction reference'))
     amount = MoneyField(max_digits=14, decimal_places=2,
                         default_currency='NGN', verbose_name=_('amount'))
     type = models.CharField(
@@ -85,6 +158,14 @@ class Transaction(TimestampedModel):
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
                              on_delete=models.CASCADE, related_name='transactions')
 
+    objects = TransactionManager()
+
+    class Meta(TimestampedModel.Meta):
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(status='pending'),
+                         name='transaction_pending'),
+        ]
+
     def __str__(self):
         return self.reference
 
@@ -104,6 +185,11 @@ class PaymentList(TimestampedModel):
 
     class Meta:
         ordering = ('order',)
+        # Pages of the payments of a group or cycle, see `base.pagination.KeysetPagination`.
+        indexes = [
+            models.Index(fields=['group', 'order', 'id'], name='payment_group_order'),
+            models.Index(fields=['cycle', 'order', 'id'], name='payment_cycle_order'),
+        ]
 
     def __str__(self):
         return str(self.payment_date)
@@ -118,3 +204,165 @@ class SavingsList(TimestampedModel):
         Transaction, on_delete=models.CASCADE, related_name='savings_list')
     user = models.ForeignKey(settings.AUTH_USER_MODEL,
                              on_delete=models.CASCADE, related_name='savings_list')
+
+    class Meta(TimestampedModel.Meta):
+        # Pages of the savings of a group or cycle, see `base.pagination.KeysetPagination`.
+        indexes = [
+            models.Index(fields=['group', 'created_at', 'id'], name='savings_group_created'),
+            models.Index(fields=['cycle', 'created_at', 'id'], name='savings_cycle_created'),
+        ]
+
+
+class Run(TimestampedModel):
+    """
+    A savings or payment run.
+
+    Runs are queued and planned by the first worker that picks them up. Workers then claim
+    the items of a run in chunks, so several workers can process a run at the same time and
+    an interrupted run is resumed from the items that have not been completed.
+    """
+    SAVINGS = 'savings'
+    PAYMENT = 'payment'
+    RUN_TYPE_CHOICES = [
+        (SAVINGS, 'Savings'),
+        (PAYMENT, 'Payment')
+    ]
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    RUN_STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (COMPLETED, 'Completed'),
+    ]
+
+    type = models.CharField(
+        max_length=128, choices=RUN_TYPE_CHOICES, verbose_name=_('run type'))
+    date = models.DateField(verbose_name=_('run date'))
+    status = models.CharField(max_length=128, choices=RUN_STATUS_CHOICES,
+                              default=QUEUED, verbose_name=_('run status'))
+    completed_at = models.DateTimeField(
+        blank=True, null=True, verbose_name=_('completed at'))
+
+    def __str__(self):
+        return f'{self.type} run for {self.date}'
+
+
+class RunItem(TimestampedModel):
+    """
+    The progress of a run for a single member of a cycle.
+    """
+    PENDING = 'pending'
+    # Sent in a bulk charge and waiting for its result from the webhook.
+    SUBMITTED = 'submitted'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    ITEM_STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SUBMITTED, 'Submitted'),
+        (COMPLETED, 'Completed'),
+        (FAILED, 'Failed'),
+    ]
+
+    run = models.ForeignKey(
+        Run, on_delete=models.CASCADE, related_name='items')
+    cycle = models.ForeignKey(
+        Cycle, on_delete=models.CASCADE, related_name='run_items')
+    group = models.ForeignKey(
+        Group, on_delete=models.CASCADE, related_name='run_items')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL,
+                             on_delete=models.CASCADE, related_name='run_items')
+    payment = models.ForeignKey(
+        PaymentList, blank=True, null=True, on_delete=models.CASCADE, related_name='run_items')
+    transaction = models.ForeignKey(
+        Transaction, blank=True, null=True, on_delete=models.SET_NULL, related_name='run_items')
+    # The reference sent to Paystack, so retrying an item cannot charge or pay a member twice.
+    reference = models.CharField(
+        max_length=255, unique=True, verbose_name=_('transaction reference'))
+    status = models.CharField(max_length=128, choices=ITEM_STATUS_CHOICES,
+                              default=PENDING, verbose_name=_('item status'))
+    # Set when a worker claims the item. Other workers can claim the item once the claim expires.
+    claimed_at = models.DateTimeField(
+        blank=True, null=True, verbose_name=_('claimed at'))
+    comments = models.TextField(
+        blank=True, default='', verbose_name=_('comments'))
+
+    class Meta:
+        unique_together = ('run', 'cycle', 'user',)
+        ordering = ('id',)
+        indexes = [
+            models.Index(fields=['run', 'id'], condition=models.Q(status__in=['pending', 'submitted']),
+                         name='transaction_runitem_open'),
+        ]
+
+    def __str__(self):
+        return self.reference
+
+
+class OutboxMessage(TimestampedModel):
+    """
+    A Paystack request to make once the transaction that created the message is committed.
+
+    Messages are written in the same database transaction as the change that needs them and
+    are sent in batches by the outbox worker, so requests do not wait for Paystack and a
+    failed request is retried instead of being lost.
+    """
+    REFUND = 'refund'
+    ACTION_CHOICES = [
+        (REFUND, 'Refund'),
+    ]
+
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    MESSAGE_STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
+    action = models.CharField(
+        max_length=128, choices=ACTION_CHOICES, verbose_name=_('action'))
+    payload = models.JSONField(default=dict, verbose_name=_('payload'))
+    status = models.CharField(max_length=128, choices=MESSAGE_STATUS_CHOICES,
+                              default=PENDING, verbose_name=_('message status'))
+    attempts = models.IntegerField(default=0, verbose_name=_('attempts'))
+    # Pending messages are sent once this time has passed. Claiming a message moves it forward,
+    # so other workers only claim the message again if the worker stops before sending it.
+    available_at = models.DateTimeField(
+        default=timezone.now, verbose_name=_('available at'))
+    comments = models.TextField(
+        blank=True, default='', verbose_name=_('comments'))
+
+    class Meta:
+        ordering = ('id',)
+        indexes = [
+            models.Index(fields=['available_at'], condition=models.Q(status='pending'),
+                         name='transaction_outbox_pending'),
+        ]
+
+    def __str__(self):
+        return f'{self.action} {self.payload}'
+
+
+class WebhookEvent(TimestampedModel):
+    """
+    A webhook event received from Paystack, waiting to be applied by the webhook consumer.
+    """
+    event = models.CharField(max_length=255, verbose_name=_('event'))
+    reference = models.CharField(
+        max_length=255, verbose_name=_('transaction reference'))
+    data = models.JSONField(default=dict, verbose_name=_('data'))
+    processed_at = models.DateTimeField(
+        blank=True, null=True, verbose_name=_('processed at'))
+
+    class Meta:
+        ordering = ('id',)
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(processed_at__isnull=True),
+                         name='transaction_webhook_pending'),
+        ]
+
+    def __str__(self):
+        return f'{self.event} {self.reference}'
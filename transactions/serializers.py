@@ -1,18 +1,21 @@
 from django.db import transaction
+from django.db.models import Count, Q
 from django.utils.translation import gettext_lazy as _
 
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError, PermissionDenied
 
 
+from base.serializers import FieldsetMixin
 from users.serializers import UserSerializer
 from groups.serializers import GroupSerializer, CycleSerializer
 
-from .models import Bank, Card, PaymentList, SavingsList, Transaction
+from . import services
+from .models import Bank, Card, PaymentList, Run, RunItem, SavingsList, Transaction
 from .utils import Paystack
 
 
-class BankSerializer(serializers.ModelSerializer):
+class BankSerializer(FieldsetMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
 
     class Meta:
@@ -25,8 +28,8 @@ class BankSerializer(serializers.ModelSerializer):
         paystack = Paystack()
 
         # Verify account number.
-        response = paystack.verify_account_number(
-            attrs['account_number'], attrs['bank_code'])
+        response = services.verify_account_number(
+            attrs['account_number'], attrs['bank_code'], paystack)
 
         if not response['status'] and 'bank code' in response['message']:
             raise serializers.ValidationError(
@@ -48,11 +51,10 @@ class BankSerializer(serializers.ModelSerializer):
                 _('This account number and bank already exist.'))
 
         # Create transfer recipient.
-        response = paystack.create_transfer_recipient(type='nuban',
-                                                      name=response['data']['account_name'],
-                                                      account_number=attrs['account_number'],
-                                                      bank_code=attrs['bank_code'],
-                                                      currency='NGN')
+        response = services.create_transfer_recipient(response['data']['account_name'],
+                                                      attrs['account_number'],
+                                                      attrs['bank_code'],
+                                                      paystack)
 
         response_data = response['data']
 
@@ -63,7 +65,7 @@ class BankSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class CardSerializer(serializers.ModelSerializer):
+class CardSerializer(FieldsetMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
 
     class Meta:
@@ -91,6 +93,7 @@ class WebhookDataSerializer(serializers.Serializer):
     amount = serializers.CharField(max_length=255, required=True)
     reference = serializers.CharField(max_length=255, required=True)
     status = serializers.CharField(max_length=255, required=True)
+    gateway_response = serializers.CharField(max_length=255, required=False, allow_blank=True)
 
 
 class WebhookSerializer(serializers.Serializer):
@@ -98,7 +101,7 @@ class WebhookSerializer(serializers.Serializer):
     data = WebhookDataSerializer(source='*')
 
 
-class TransactionSerializer(serializers.ModelSerializer):
+class TransactionSerializer(FieldsetMixin, serializers.ModelSerializer):
     user = UserSerializer()
 
     class Meta:
@@ -107,7 +110,7 @@ class TransactionSerializer(serializers.ModelSerializer):
                   'type', 'status', 'comments', 'user',)
 
 
-class SavingsListSerializer(serializers.ModelSerializer):
+class SavingsListSerializer(FieldsetMixin, serializers.ModelSerializer):
     cycle = CycleSerializer()
     transaction = TransactionSerializer()
     user = UserSerializer()
@@ -117,7 +120,7 @@ class SavingsListSerializer(serializers.ModelSerializer):
         fields = ('id', 'cycle', 'group', 'transaction', 'user',)
 
 
-class PaymentListSerializer(serializers.ModelSerializer):
+class PaymentListSerializer(FieldsetMixin, serializers.ModelSerializer):
     cycle = CycleSerializer()
     transaction = TransactionSerializer()
     user = UserSerializer()
@@ -126,3 +129,20 @@ class PaymentListSerializer(serializers.ModelSerializer):
         model = PaymentList
         fields = ('id', 'order', 'cycle', 'group',
                   'payment_date', 'transaction', 'user')
+
+
+class RunSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Run
+        fields = ('id', 'type', 'date', 'status', 'progress',
+                  'created_at', 'completed_at',)
+
+    def get_progress(self, obj):
+        return obj.items.aggregate(
+            total=Count('id'),
+            pending=Count('id', filter=Q(status=RunItem.PENDING)),
+            submitted=Count('id', filter=Q(status=RunItem.SUBMITTED)),
+            completed=Count('id', filter=Q(status=RunItem.COMPLETED)),
+            failed=Count('id', filter=Q(status=RunItem.FAILED)))
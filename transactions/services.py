@@ -1,9 +1,28 @@
+import logging
 import random
-from datetime import datetime
+import time
+from decimal import Decimal
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 
 from dateutil.relativedelta import relativedelta
+from django_pglocks import advisory_lock
+
+from groups.models import Cycle, Membership
+
+from .dispatchers import Dispatcher
+from .models import (Bank, Card, OutboxMessage, PaymentList, Run, RunItem, SavingsList, Transaction,
+                     WebhookEvent)
+from .utils import Paystack
 
-from .models import PaymentList
+
+logger = logging.getLogger(__name__)
 
 
 def generate_payment_list(**kwargs):
@@ -48,3 +67,989 @@ def append_member_to_payment_list(**kwargs):
         order=payment_list.order+1, group=kwargs['group'], cycle=kwargs['cycle'], payment_date=payment_date, user=kwargs['user'])
 
     return True
+
+
+def get_cached_response(key, call):
+    """
+    Get the cached response of a Paystack request, or make the request and cache its response.
+    Only successful responses are cached, for `PAYSTACK_CACHE_TIMEOUT` seconds.
+
+    :param key: The cache key of the request.
+    :param call: Callable that makes the request.
+
+    :return: The Paystack response.
+    """
+    response = cache.get(key)
+
+    if response is None:
+        response = call()
+
+        if response['status']:
+            cache.set(key, response, settings.PAYSTACK_CACHE_TIMEOUT)
+
+    return response
+
+
+def verify_account_number(account_number, bank_code, paystack=None):
+    """
+    Resolve the name of a bank account.
+
+    :param account_number: The account number.
+    :param bank_code: The code of the bank.
+    :param paystack: The `Paystack` client used if the account is not cached.
+
+    :return: The Paystack response.
+    """
+    paystack = paystack or Paystack()
+
+    return get_cached_response(f'paystack:account:{bank_code}:{account_number}',
+                               lambda: paystack.verify_account_number(account_number, bank_code))
+
+
+def create_transfer_recipient(account_name, account_number, bank_code, paystack=None):
+    """
+    Create the transfer recipient of a bank account,
+    or get the recipient created for the account earlier.
+
+    :param account_name: The resolved name of the account.
+    :param account_number: The account number.
+    :param bank_code: The code of the bank.
+    :param paystack: The `Paystack` client used if the recipient is not cached.
+
+    :return: The Paystack response.
+    """
+    paystack = paystack or Paystack()
+
+    return get_cached_response(f'paystack:recipient:{bank_code}:{account_number}',
+                               lambda: paystack.create_transfer_recipient(type='nuban',
+                                                                          name=account_name,
+                                                                          account_number=account_number,
+                                                                          bank_code=bank_code,
+                                                                          currency='NGN'))
+
+
+def get_due_cycles(date):
+    """
+    Get the cycles that have their next saving date on `date`.
+
+    :param date: The saving date.
+
+    :return: Queryset of `Cycle` instances with their groups.
+    """
+    return Cycle.objects.select_related('group').filter(next_saving_date=date)
+
+
+def get_default_cards(user_ids):
+    """
+    Get the card to charge for each user.
+
+    A card marked as default is preferred, otherwise the most recently added card is used.
+
+    :param user_ids: List of user ids.
+
+    :return: Dict mapping each user id to a `Card` instance.
+    """
+    cards = Card.objects.filter(user_id__in=user_ids).order_by(
+        'user_id', '-is_default', '-created_at').distinct('user_id')
+
+    return {card.user_id: card for card in cards}
+
+
+def get_default_banks(user_ids):
+    """
+    Get the bank to pay for each user.
+
+    A bank marked as default is preferred, otherwise the most recently added bank is used.
+
+    :param user_ids: List of user ids.
+
+    :return: Dict mapping each user id to a `Bank` instance.
+    """
+    banks = Bank.objects.filter(user_id__in=user_ids).order_by(
+        'user_id', '-is_default', '-created_at').distinct('user_id')
+
+    return {bank.user_id: bank for bank in banks}
+
+
+def get_member_counts(group_ids):
+    """
+    Get the number of members in each group.
+
+    :param group_ids: List of group ids.
+
+    :return: Dict mapping each group id to its number of members.
+    """
+    return dict(Membership.objects.filter(group_id__in=group_ids).values_list(
+        'group_id').annotate(count=Count('id')).order_by())
+
+
+def get_amount_to_save(group):
+    """
+    Get the amount to charge a member of a group.
+
+    :param group: The group.
+
+    :return: The amount as an integer.
+    """
+    return int(Decimal(group.amount_to_save.amount)) * 10
+
+
+def get_amount_to_pay(group, member_count):
+    """
+    Get the amount to pay a member of a group.
+    The amount to pay is the amount saved multiplied by the number of group members.
+
+    :param group: The group.
+    :param member_count: The number of members in the group.
+
+    :return: The amount in kobo.
+    """
+    return int(Decimal(group.amount_to_save.amount)) * member_count * 100
+
+
+def build_transaction(response_data, type, user):
+    """
+    Build an unsaved transaction from a Paystack response.
+
+    :param response_data: The `data` content of the Paystack response.
+    :param type: The transaction type.
+    :param user: The user the transaction belongs to.
+
+    :return: A `Transaction` instance.
+    """
+    return Transaction(amount=response_data['amount'] / 100, reference=response_data['reference'],
+                       type=type, status=response_data['status'], user=user)
+
+
+def update_next_saving_dates(cycles, date):
+    """
+    Move the next saving date of `cycles` a week ahead of `date`,
+    or clear it for cycles that end on `date`.
+
+    :param cycles: List of `Cycle` instances.
+    :param date: The current saving date.
+    """
+    ending = [cycle.id for cycle in cycles if cycle.end_date == date]
+    ongoing = [cycle.id for cycle in cycles if cycle.end_date != date]
+
+    if ending:
+        Cycle.objects.filter(id__in=ending).update(next_saving_date=None)
+
+    if ongoing:
+        Cycle.objects.filter(id__in=ongoing).update(
+            next_saving_date=date + timedelta(days=7))
+
+
+def get_savings_run_items(run):
+    """
+    Plan a savings run: one item for each member of the cycles due on the run date.
+
+    :param run: The savings run.
+
+    :return: List of unsaved `RunItem` instances.
+    """
+    cycles_by_group = {cycle.group_id: cycle for cycle in get_due_cycles(run.date)}
+    memberships = Membership.objects.filter(
+        group_id__in=cycles_by_group.keys()).order_by('group_id', 'id')
+
+    return [RunItem(run=run, cycle=cycles_by_group[membership.group_id], group_id=membership.group_id,
+                    user_id=membership.user_id,
+                    reference=f'SAV-{run.id}-{cycles_by_group[membership.group_id].id}-{membership.user_id}')
+            for membership in memberships]
+
+
+def get_payment_run_items(run):
+    """
+    Plan a payment run: one item for each payment due on the run date that has not been attempted.
+
+    :param run: The payment run.
+
+    :return: List of unsaved `RunItem` instances.
+    """
+    payments = PaymentList.objects.filter(
+        payment_date=run.date, transaction__isnull=True).order_by('group_id', 'order')
+
+    return [RunItem(run=run, cycle_id=payment.cycle_id, group_id=payment.group_id, user_id=payment.user_id,
+                    payment=payment, reference=f'PAY-{run.id}-{payment.id}')
+            for payment in payments]
+
+
+def enqueue_run(type, date):
+    """
+    Queue a run of `type` for `date`, unless an unfinished one already exists.
+
+    :param type: The run type.
+    :param date: The run date.
+
+    :return: A `Run` instance.
+    """
+    with advisory_lock(f'run-{type}-{date}'):
+        run = Run.objects.filter(type=type, date=date,
+                                 status__in=[Run.QUEUED, Run.RUNNING]).first()
+
+        if not run:
+            run = Run.objects.create(type=type, date=date)
+
+    return run
+
+
+def plan_run(run):
+    """
+    Plan the items of a queued run and mark it as running.
+    The run must be locked by the caller.
+
+    :param run: The run.
+    """
+    planners = {Run.SAVINGS: get_savings_run_items,
+                Run.PAYMENT: get_payment_run_items}
+
+    if run.status == Run.QUEUED:
+        RunItem.objects.bulk_create(
+            planners[run.type](run), batch_size=settings.RUN_CHUNK_SIZE)
+        run.status = Run.RUNNING
+        run.save()
+
+
+def get_claimable_items(run, shard=None):
+    """
+    Get the pending items of a run that are not claimed by a worker.
+    Items claimed more than `RUN_LEASE_TIMEOUT` seconds ago can be claimed again,
+    including submitted items whose bulk charge result has not been received.
+
+    :param run: The run.
+    :param shard: Optional `(index, count)` tuple. Only items of the groups whose id
+                  modulo `count` is `index` are returned.
+
+    :return: Queryset of `RunItem` instances.
+    """
+    expired_at = timezone.now() - timedelta(seconds=settings.RUN_LEASE_TIMEOUT)
+    items = run.items.filter(Q(status=RunItem.PENDING, claimed_at__isnull=True) |
+                             Q(status__in=[RunItem.PENDING, RunItem.SUBMITTED], claimed_at__lt=expired_at))
+
+    if shard:
+        index, count = shard
+        items = items.annotate(shard=F('group_id') % count).filter(shard=index)
+
+    return items
+
+
+def claim_run(run=None, shard=None):
+    """
+    Get a run to work on.
+
+    A queued run is planned by the first worker that picks it up. When no run is given,
+    queued runs being planned by another worker are skipped, and the oldest running run
+    with items left to claim is returned if there is no queued run.
+
+    :param run: The run to work on. Any run is picked if no run is given.
+    :param shard: Optional `(index, count)` tuple of the groups the worker processes.
+
+    :return: A `Run` instance, or None if there is nothing to work on.
+    """
+    with transaction.atomic():
+        runs = Run.objects.select_for_update(
+            skip_locked=run is None).filter(status=Run.QUEUED)
+
+        if run:
+            runs = runs.filter(id=run.id)
+
+        queued_run = runs.order_by('created_at').first()
+
+        if queued_run:
+            plan_run(queued_run)
+            return queued_run
+
+    if run:
+        run.refresh_from_db()
+        return run
+
+    for running_run in Run.objects.filter(status=Run.RUNNING).order_by('created_at'):
+        if get_claimable_items(running_run, shard).exists():
+            return running_run
+
+    return None
+
+
+def claim_run_items(run, chunk_size, shard=None):
+    """
+    Claim a chunk of pending items of a run.
+    Items locked or claimed by other workers are skipped, so every worker gets different items.
+
+    :param run: The run.
+    :param chunk_size: The maximum number of items to claim.
+    :param shard: Optional `(index, count)` tuple of the groups the worker processes.
+
+    :return: List of claimed `RunItem` instances.
+    """
+    claimed_at = timezone.now()
+    items = get_claimable_items(run, shard).select_for_update(skip_locked=True, of=('self',))
+
+    with transaction.atomic():
+        items = list(items.select_related('cycle', 'group', 'user', 'payment')
+                     .order_by('id')[:chunk_size])
+        RunItem.objects.filter(id__in=[item.id for item in items]).update(
+            claimed_at=claimed_at)
+
+    for item in items:
+        item.claimed_at = claimed_at
+
+    return items
+
+
+def recover_response(response, verify, reference):
+    """
+    Check whether a rejected request was already completed by an earlier attempt with
+    the same reference, e.g. before a run was interrupted.
+
+    :param response: The Paystack response of the rejected request.
+    :param verify: The Paystack method used to look up `reference`.
+    :param reference: The reference of the request.
+
+    :return: The response of the earlier attempt if it exists, otherwise `response`.
+    """
+    if response['status']:
+        return response
+
+    verification = verify(reference)
+
+    return verification if verification['status'] else response
+
+
+def set_item_result(item, response, error, type):
+    """
+    Record the result of a provider request on a run item.
+
+    An item with an error is left pending, so it is retried when the run is resumed.
+
+    :param item: The run item.
+    :param response: The Paystack response.
+    :param error: The exception raised by the request, if any.
+    :param type: The type of transaction to record.
+
+    :return: True if the request was successful.
+    """
+    if error:
+        return False
+
+    if not response['status']:
+        item.status = RunItem.FAILED
+        item.comments = str(response['message'])
+        return False
+
+    item.status = RunItem.COMPLETED
+    item.transaction = build_transaction(response['data'], type, item.user)
+
+    return True
+
+
+def log_item_failure(item, error):
+    """
+    Log why the provider request of a run item failed.
+
+    :param item: The run item.
+    :param error: The exception raised by the request, if any.
+    """
+    if error:
+        logger.warning('Request for run item %s failed and will be retried: %s', item.reference, error)
+    elif item.status == RunItem.FAILED:
+        logger.warning('Run item %s failed: %s', item.reference, item.comments)
+
+
+@transaction.atomic
+def save_run_items(items, savings=None, payments=None):
+    """
+    Save the results of claimed run items along with their transactions in bulk.
+
+    Results are only saved for items the worker still holds a claim on. If the claim expired
+    and another worker claimed an item, its results are left for that worker to save.
+
+    :param items: List of processed `RunItem` instances with the same claim.
+    :param savings: List of unsaved `SavingsList` instances.
+    :param payments: List of `PaymentList` instances that were paid.
+    """
+    items = [item for item in items if item.status != RunItem.PENDING]
+
+    if not items:
+        return
+
+    claimed_ids = set(RunItem.objects.select_for_update().filter(
+        id__in=[item.id for item in items], status__in=[RunItem.PENDING, RunItem.SUBMITTED],
+        claimed_at=items[0].claimed_at).values_list('id', flat=True))
+
+    save_item_results([item for item in items if item.id in claimed_ids], savings, payments)
+
+
+def save_item_results(items, savings=None, payments=None):
+    """
+    Save the results of run items along with their transactions in bulk.
+
+    :param items: List of processed `RunItem` instances.
+    :param savings: List of unsaved `SavingsList` instances.
+    :param payments: List of `PaymentList` instances that were paid.
+    """
+    now = timezone.now()
+
+    Transaction.objects.upsert(
+        [item.transaction for item in items if item.transaction])
+
+    for item in items:
+        item.transaction_id = item.transaction.pk if item.transaction else None
+        item.updated_at = now
+
+    # Only the transactions of claimed items were saved.
+    savings = [saving for saving in savings or [] if saving.transaction.pk]
+    payments = [payment for payment in payments or [] if payment.transaction.pk]
+
+    for payment in payments:
+        payment.transaction_id = payment.transaction.pk
+
+    SavingsList.objects.bulk_create(savings)
+    PaymentList.objects.bulk_update(payments, ['transaction'])
+    RunItem.objects.bulk_update(
+        items, ['status', 'transaction', 'comments', 'updated_at'])
+
+
+def process_savings_items(items, paystack, dispatcher):
+    """
+    Charge the members of savings run items.
+
+    Charges for different groups are made concurrently, while charges within a group
+    are made in membership order.
+    """
+    cards = get_default_cards([item.user_id for item in items])
+    savings = []
+
+    def charge(item):
+        card = cards.get(item.user_id)
+
+        if not card:
+            return {'status': False, 'message': _('No card found.')}
+
+        response = paystack.charge_authorization(
+            card.authorization_code, item.user.email, get_amount_to_save(item.group),
+            reference=item.reference)
+
+        return recover_response(response, paystack.verify_transaction, item.reference)
+
+    results = dispatcher.dispatch(items, charge, key=lambda item: item.group_id)
+
+    for item, response, error in results:
+        if set_item_result(item, response, error, Transaction.SAVINGS):
+            savings.append(SavingsList(cycle=item.cycle, group=item.group,
+                                       transaction=item.transaction, user=item.user))
+        else:
+            log_item_failure(item, error)
+
+    save_run_items(items, savings=savings)
+
+
+def get_verified_charge(verification):
+    """
+    Get the result of a charge from its Paystack verification.
+
+    :param verification: The Paystack response of the verification.
+
+    :return: The response to record on the run item, or None if the charge is still processing.
+    """
+    data = verification['data']
+
+    if data['status'] == Transaction.SUCCESS:
+        return verification
+
+    if data['status'] in [Transaction.FAILED, Transaction.ABANDONED, Transaction.REVERSED]:
+        return {'status': False, 'message': data.get('gateway_response') or data['status']}
+
+    return None
+
+
+def process_bulk_savings_items(items, paystack, dispatcher):
+    """
+    Charge the members of savings run items with bulk charges.
+
+    Charges are submitted in batches of up to `PAYSTACK_BULK_CHARGE_LIMIT` and their results
+    are recorded by `reconcile_charges` when the webhook events are applied. Submitted items whose
+    claim expired before their result was received are verified instead, and submitted again
+    if Paystack has no charge with their reference.
+    """
+    cards = get_default_cards([item.user_id for item in items])
+    items_by_reference = {item.reference: item for item in items}
+    results = {}
+    charges = []
+    savings = []
+
+    def verify(item):
+        return paystack.verify_transaction(item.reference)
+
+    submitted = [item for item in items if item.status == RunItem.SUBMITTED]
+    unsubmitted = [item for item in items if item.status == RunItem.PENDING]
+
+    for item, verification, error in dispatcher.dispatch(submitted, verify):
+        if error:
+            results[item.reference] = (None, error)
+        elif verification['status']:
+            results[item.reference] = (get_verified_charge(verification), None)
+        else:
+            unsubmitted.append(item)
+
+    for item in unsubmitted:
+        card = cards.get(item.user_id)
+
+        if not card:
+            results[item.reference] = ({'status': False, 'message': _('No card found.')}, None)
+            continue
+
+        # `charge_authorization` converts the amount to save to kobo the same way.
+        charges.append({'authorization': card.authorization_code,
+                        'amount': get_amount_to_save(item.group) * 10, 'reference': item.reference})
+
+    limit = settings.PAYSTACK_BULK_CHARGE_LIMIT
+    batches = [charges[idx:idx + limit] for idx in range(0, len(charges), limit)]
+    rejections = {}
+
+    for batch, response, error in dispatcher.dispatch(batches, paystack.bulk_charge):
+        for charge in batch:
+            item = items_by_reference[charge['reference']]
+
+            if error:
+                results[item.reference] = (None, error)
+            elif response['status']:
+                item.status = RunItem.SUBMITTED
+            else:
+                rejections[item.reference] = response
+
+    # The whole batch is rejected if a reference was used by an earlier attempt.
+    rejected = [items_by_reference[reference] for reference in rejections]
+
+    for item, verification, error in dispatcher.dispatch(rejected, verify):
+        if error:
+            results[item.reference] = (None, error)
+        elif verification['status']:
+            results[item.reference] = (get_verified_charge(verification), None)
+        else:
+            results[item.reference] = (rejections[item.reference], None)
+
+    for item in items:
+        response, error = results.get(item.reference, (None, None))
+
+        # Charges without a result are still processing.
+        if not response and not error:
+            continue
+
+        if set_item_result(item, response, error, Transaction.SAVINGS):
+            savings.append(SavingsList(cycle=item.cycle, group=item.group,
+                                       transaction=item.transaction, user=item.user))
+        else:
+            log_item_failure(item, error)
+
+    save_run_items(items, savings=savings)
+
+
+@transaction.atomic
+def reconcile_charges(charges):
+    """
+    Record the results of bulk charges received through the webhook.
+
+    :param charges: List of the `data` content of charge events.
+
+    :return: Set of the `Run` instances with reconciled items.
+    """
+    charges = {data['reference']: data for data in charges}
+    items = RunItem.objects.select_for_update(of=('self',)).select_related(
+        'run', 'cycle', 'group', 'user').filter(
+        reference__in=charges, run__type=Run.SAVINGS,
+        status__in=[RunItem.PENDING, RunItem.SUBMITTED]).order_by('id')
+    reconciled = []
+    savings = []
+
+    for item in items:
+        data = charges[item.reference]
+        response = get_verified_charge(
+            {'status': True, 'data': {**data, 'amount': int(data['amount'])}})
+
+        if not response:
+            continue
+
+        if set_item_result(item, response, None, Transaction.SAVINGS):
+            savings.append(SavingsList(cycle=item.cycle, group=item.group,
+                                       transaction=item.transaction, user=item.user))
+
+        reconciled.append(item)
+
+    save_item_results(reconciled, savings=savings)
+
+    return {item.run for item in reconciled}
+
+
+# Paystack accepts the transfers of a bulk transfer with these statuses. The transfers are pending
+# until a webhook or a reconciliation reports their result.
+BULK_TRANSFER_ACCEPTED_STATUSES = ('received', 'queued', 'pending')
+
+
+def get_bulk_transfer_results(transfers, response, error, verify):
+    """
+    Match the result of a bulk transfer request to each of its transfers.
+
+    :param transfers: List of transfers sent in the request.
+    :param response: The Paystack response.
+    :param error: The exception raised by the request, if any.
+    :param verify: The Paystack method used to look up a transfer reference.
+
+    :return: Dict mapping each transfer reference to a `(response, error)` tuple.
+    """
+    if error:
+        return {transfer['reference']: (None, error) for transfer in transfers}
+
+    if not response['status']:
+        # The whole batch is rejected if a reference was used by an earlier attempt.
+        return {transfer['reference']: (recover_response(response, verify, transfer['reference']), None)
+                for transfer in transfers}
+
+    data = {result['reference']: result for result in response['data']}
+    results = {}
+
+    for transfer in transfers:
+        reference = transfer['reference']
+
+        if reference in data:
+            result = {**transfer, **data[reference]}
+
+            if result.get('status', 'received') in BULK_TRANSFER_ACCEPTED_STATUSES:
+                result['status'] = Transaction.PENDING
+
+            results[reference] = ({'status': True, 'message': response['message'], 'data': result}, None)
+        else:
+            not_found = {'status': False, 'message': _('Transfer not found.')}
+            results[reference] = (recover_response(not_found, verify, reference), None)
+
+    return results
+
+
+def process_payment_items(items, paystack, dispatcher):
+    """
+    Transfer the amount saved in a cycle to the members of payment run items.
+
+    Transfers are sent in bulk requests of up to `PAYSTACK_BULK_TRANSFER_LIMIT` transfers
+    and their results are matched to the items by reference.
+    """
+    banks = get_default_banks([item.user_id for item in items])
+    member_counts = get_member_counts({item.group_id for item in items})
+    results = {}
+    transfers = []
+    payments = []
+
+    for item in items:
+        bank = banks.get(item.user_id)
+
+        if not bank:
+            results[item.reference] = ({'status': False, 'message': _('No bank found.')}, None)
+            continue
+
+        transfers.append({'amount': get_amount_to_pay(item.group, member_counts.get(item.group_id, 0)),
+                          'recipient': bank.transfer_recipient, 'reference': item.reference})
+
+    limit = settings.PAYSTACK_BULK_TRANSFER_LIMIT
+    batches = [transfers[idx:idx + limit] for idx in range(0, len(transfers), limit)]
+
+    for batch, response, error in dispatcher.dispatch(batches, paystack.bulk_transfers):
+        results.update(get_bulk_transfer_results(
+            batch, response, error, paystack.verify_transfer))
+
+    for item in items:
+        response, error = results[item.reference]
+
+        if set_item_result(item, response, error, Transaction.PAYMENT):
+            item.payment.transaction = item.transaction
+            payments.append(item.payment)
+        else:
+            log_item_failure(item, error)
+
+    save_run_items(items, payments=payments)
+
+
+def finish_run(run):
+    """
+    Mark a running run as completed if none of its items are pending or submitted.
+    Completing a savings run moves its cycles to their next saving date.
+
+    :param run: The run.
+
+    :return: True if the run is completed.
+    """
+    with transaction.atomic():
+        run = Run.objects.select_for_update().get(id=run.id)
+
+        if run.status != Run.RUNNING:
+            return run.status == Run.COMPLETED
+
+        if run.items.filter(status__in=[RunItem.PENDING, RunItem.SUBMITTED]).exists():
+            return False
+
+        if run.type == Run.SAVINGS:
+            # Cycles without members have no items, but are due as well.
+            update_next_saving_dates(get_due_cycles(run.date), run.date)
+
+        run.status = Run.COMPLETED
+        run.completed_at = timezone.now()
+        run.save()
+
+    return True
+
+
+def process_run(run, chunk_size=None, dispatcher=None, progress=None, shard=None):
+    """
+    Claim and process the pending items of a run in chunks, then try to finish the run.
+
+    Several workers can process a run at the same time. Items that raised an error
+    stay pending and are retried once their claim expires.
+
+    :param run: The run.
+    :param chunk_size: The number of items to claim, process and save at a time.
+    :param dispatcher: The `Dispatcher` used to make provider requests.
+    :param progress: Callable that is passed the run, the number of items processed
+                     and the number of items pending when processing started, after each chunk.
+    :param shard: Optional `(index, count)` tuple of the groups the worker processes.
+
+    :return: The run.
+    """
+    processors = {Run.SAVINGS: process_bulk_savings_items if settings.PAYSTACK_BULK_CHARGE else process_savings_items,
+                  Run.PAYMENT: process_payment_items}
+    chunk_size = chunk_size or settings.RUN_CHUNK_SIZE
+    dispatcher = dispatcher or Dispatcher()
+    paystack = Paystack()
+    total = get_claimable_items(run, shard).count()
+    processed = 0
+
+    while True:
+        items = claim_run_items(run, chunk_size, shard=shard)
+
+        if not items:
+            break
+
+        processors[run.type](items, paystack, dispatcher)
+        processed += len(items)
+
+        if progress:
+            progress(run, processed, total)
+
+    finish_run(run)
+    run.refresh_from_db()
+
+    return run
+
+
+def run_savings(date, **options):
+    """
+    Charge every member of the cycles due for saving on `date`,
+    resuming the unfinished savings run for `date` if there is one.
+
+    :param date: The saving date.
+    :param options: Options passed to `process_run`.
+
+    :return: The savings run.
+    """
+    run = claim_run(enqueue_run(Run.SAVINGS, date))
+
+    return process_run(run, **options)
+
+
+def run_payouts(date, **options):
+    """
+    Pay every member whose payment date is `date`,
+    resuming the unfinished payment run for `date` if there is one.
+
+    :param date: The payment date.
+    :param options: Options passed to `process_run`.
+
+    :return: The payment run.
+    """
+    run = claim_run(enqueue_run(Run.PAYMENT, date))
+
+    return process_run(run, **options)
+
+
+# The `Paystack` method each outbox action is sent with. The payload of a message is passed as arguments.
+OUTBOX_ACTIONS = {
+    OutboxMessage.REFUND: 'create_refund',
+}
+
+
+def claim_outbox_messages(batch_size):
+    """
+    Claim a batch of pending outbox messages that are due.
+    Messages locked by other workers are skipped, so every worker gets different messages.
+
+    :param batch_size: The maximum number of messages to claim.
+
+    :return: List of `OutboxMessage` instances.
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        messages = list(OutboxMessage.objects.select_for_update(skip_locked=True).filter(
+            status=OutboxMessage.PENDING, available_at__lte=now).order_by('available_at')[:batch_size])
+        OutboxMessage.objects.filter(id__in=[message.id for message in messages]).update(
+            available_at=now + timedelta(seconds=settings.OUTBOX_LEASE_TIMEOUT))
+
+    return messages
+
+
+def drain_outbox(batch_size=None, dispatcher=None, paystack=None):
+    """
+    Send a batch of pending outbox messages.
+
+    Messages whose request raised an error are retried with exponential backoff, up to
+    `OUTBOX_MAX_ATTEMPTS` attempts. Messages rejected by Paystack are not retried.
+
+    :param batch_size: The maximum number of messages to send.
+    :param dispatcher: The `Dispatcher` used to make provider requests.
+    :param paystack: The `Paystack` client.
+
+    :return: List of the `OutboxMessage` instances that were sent or attempted.
+    """
+    messages = claim_outbox_messages(batch_size or settings.OUTBOX_BATCH_SIZE)
+    dispatcher = dispatcher or Dispatcher()
+    paystack = paystack or Paystack()
+    now = timezone.now()
+
+    def send(message):
+        return getattr(paystack, OUTBOX_ACTIONS[message.action])(**message.payload)
+
+    for message, response, error in dispatcher.dispatch(messages, send):
+        message.attempts += 1
+        message.updated_at = now
+
+        if error and message.attempts < settings.OUTBOX_MAX_ATTEMPTS:
+            message.available_at = now + timedelta(
+                seconds=settings.OUTBOX_RETRY_DELAY * 2 ** (message.attempts - 1))
+            message.comments = str(error)
+        elif error:
+            message.status = OutboxMessage.FAILED
+            message.comments = str(error)
+        elif not response['status']:
+            message.status = OutboxMessage.FAILED
+            message.comments = str(response['message'])
+        else:
+            message.status = OutboxMessage.SENT
+            message.comments = ''
+
+    OutboxMessage.objects.bulk_update(
+        messages, ['status', 'attempts', 'available_at', 'comments', 'updated_at'])
+
+    return messages
+
+
+RECONCILE_VERIFIERS = {
+    Transaction.SAVINGS: 'verify_transaction',
+    Transaction.PAYMENT: 'verify_transfer',
+}
+
+
+def get_stale_transactions(before, chunk_size):
+    """
+    Get the pending transactions last updated before `before` in chunks.
+    Chunks are paginated by id, so every query only reads the next `chunk_size` pending rows.
+
+    :param before: The time the transactions were last updated before.
+    :param chunk_size: The number of transactions in each chunk.
+
+    :return: Iterator of lists of `Transaction` instances.
+    """
+    last_id = 0
+
+    while True:
+        chunk = list(Transaction.objects.filter(
+            status=Transaction.PENDING, updated_at__lt=before, id__gt=last_id).only(
+            'id', 'reference', 'type', 'status').order_by('id')[:chunk_size])
+
+        if not chunk:
+            return
+
+        yield chunk
+        last_id = chunk[-1].id
+
+
+def reconcile_transactions(older_than=None, chunk_size=None, time_limit=None, dispatcher=None,
+                           paystack=None, progress=None):
+    """
+    Verify stale pending transactions with Paystack and save the statuses that changed in bulk.
+
+    Transactions are verified concurrently by `dispatcher`, within the rate limit of the `verify`
+    endpoint family. Transactions that Paystack reports as pending or cannot find stay pending.
+
+    :param older_than: The number of seconds a transaction must have been pending for.
+                       Defaults to `RECONCILE_AFTER`.
+    :param chunk_size: The number of transactions to verify and save at a time.
+    :param time_limit: The number of seconds after which no new chunk is started.
+    :param dispatcher: The `Dispatcher` used to make provider requests.
+    :param paystack: The `Paystack` client.
+    :param progress: Callable that is passed the number of transactions checked and updated so far,
+                     after each chunk.
+
+    :return: Tuple of the number of transactions checked and updated.
+    """
+    older_than = settings.RECONCILE_AFTER if older_than is None else older_than
+    before = timezone.now() - timedelta(seconds=older_than)
+    dispatcher = dispatcher or Dispatcher()
+    paystack = paystack or Paystack()
+    statuses = dict(Transaction.PAYMENT_STATUS_CHOICES)
+    started_at = time.monotonic()
+    checked = updated = 0
+
+    def verify(pending):
+        return getattr(paystack, RECONCILE_VERIFIERS[pending.type])(pending.reference)
+
+    for chunk in get_stale_transactions(before, chunk_size or settings.RECONCILE_CHUNK_SIZE):
+        changes = {}
+
+        for pending, response, error in dispatcher.dispatch(chunk, verify):
+            if error or not response['status']:
+                continue
+
+            status = response['data']['status']
+
+            if status in statuses and status != Transaction.PENDING:
+                changes[pending.reference] = status
+
+        Transaction.objects.set_statuses(changes)
+        checked += len(chunk)
+        updated += len(changes)
+
+        if progress:
+            progress(checked, updated)
+
+        if time_limit is not None and time.monotonic() - started_at >= time_limit:
+            break
+
+    return checked, updated
+
+
+def consume_webhook_events(batch_size=None):
+    """
+    Apply a batch of queued webhook events.
+
+    Paystack may send an event more than once, so events are deduplicated by event and reference
+    before they are applied. Charge events settle the items of bulk charge runs, and the status
+    of every referenced transaction is updated in a single query.
+    Events locked by other consumers are skipped, so every consumer gets different events.
+
+    :param batch_size: The maximum number of events to apply.
+
+    :return: List of the applied `WebhookEvent` instances.
+    """
+    with transaction.atomic():
+        events = list(WebhookEvent.objects.select_for_update(skip_locked=True).filter(
+            processed_at__isnull=True).order_by('id')[:batch_size or settings.WEBHOOK_BATCH_SIZE])
+
+        # Later events replace earlier ones.
+        latest = {(event.event, event.reference): event for event in events}
+        runs = reconcile_charges([event.data for (name, reference), event in latest.items()
+                                  if name.startswith('charge.')])
+        Transaction.objects.set_statuses(
+            {event.reference: event.data['status'] for event in sorted(latest.values(), key=lambda e: e.id)})
+        WebhookEvent.objects.filter(id__in=[event.id for event in events]).update(
+            processed_at=timezone.now())
+
+    for run in runs:
+        finish_run(run)
+
+    return events
@@ -1,4 +1,4 @@
-from .utils import Paystack
+from django.apps import apps
 
 
 def card_post_save(sender, instance, created, **kwargs):
@@ -6,5 +6,6 @@ def card_post_save(sender, instance, created, **kwargs):
         return
 
     # Refund user after saving card details.
-    paystack = Paystack()
-    paystack.create_refund(instance.reference)
+    # The refund is sent from the outbox once the card is committed.
+    OutboxMessage = apps.get_model('transactions', 'OutboxMessage')
+    OutboxMessage.objects.create(action=OutboxMessage.REFUND, payload={'reference': instance.reference})
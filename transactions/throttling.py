@@ -0,0 +1,180 @@
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+
+class TokenBucket():
+    """
+    Limit requests to `rate` requests per second, with bursts of up to `capacity` requests.
+
+    Tokens are reserved ahead of time, so callers wait their turn instead of retrying.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.waits = 0
+        self.wait_time = 0
+        self.pauses = 0
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self):
+        """
+        Take a token.
+
+        :return: The number of seconds to wait before making the request.
+        """
+        with self.lock:
+            self.refill(time.monotonic())
+            self.tokens -= 1
+            wait = max(-self.tokens / self.rate, 0)
+
+            self.requests += 1
+            self.waits += wait > 0
+            self.wait_time += wait
+
+        return wait
+
+    def pause(self, seconds):
+        """
+        Hold back requests for `seconds`, e.g. after the provider asked to retry later.
+        """
+        with self.lock:
+            self.refill(time.monotonic())
+            self.tokens = min(self.tokens, -seconds * self.rate)
+            self.pauses += 1
+
+    def get_metrics(self):
+        with self.lock:
+            self.refill(time.monotonic())
+
+            return {'rate': self.rate, 'tokens': round(self.tokens, 2), 'requests': self.requests,
+                    'waits': self.waits, 'wait_time': round(self.wait_time, 3), 'pauses': self.pauses}
+
+
+class CircuitBreaker():
+    """
+    Stop requests after a burst of failures.
+
+    The circuit opens when `threshold` requests fail within `window` seconds. After `timeout`
+    seconds a single trial request is allowed: the circuit closes if it succeeds and opens
+    again if it fails.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, threshold, window, timeout):
+        self.threshold = threshold
+        self.window = window
+        self.timeout = timeout
+        self.state = self.CLOSED
+        self.failures = deque()
+        self.opened_at = None
+        self.trial = False
+        self.lock = threading.Lock()
+        self.trips = 0
+        self.rejected = 0
+
+    def allow(self):
+        """
+        Check whether a request can be made.
+
+        :return: True if the request can be made.
+        """
+        with self.lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.timeout:
+                self.state = self.HALF_OPEN
+                self.trial = False
+
+            if self.state == self.CLOSED or (self.state == self.HALF_OPEN and not self.trial):
+                self.trial = self.state == self.HALF_OPEN
+                return True
+
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.CLOSED
+                self.failures.clear()
+
+    def record_failure(self):
+        with self.lock:
+            now = time.monotonic()
+            self.failures.append(now)
+
+            while self.failures and now - self.failures[0] > self.window:
+                self.failures.popleft()
+
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and len(self.failures) >= self.threshold):
+                self.state = self.OPEN
+                self.opened_at = now
+                self.trips += 1
+
+    def get_metrics(self):
+        with self.lock:
+            return {'state': self.state, 'failures': len(self.failures),
+                    'trips': self.trips, 'rejected': self.rejected}
+
+
+_buckets = {}
+_breakers = {}
+_lock = threading.Lock()
+
+
+def get_token_bucket(family):
+    """
+    Get the token bucket shared by the requests of an endpoint family in this process.
+    The rate of each family is set in `PAYSTACK_RATE_LIMITS`.
+    """
+    with _lock:
+        if family not in _buckets:
+            _buckets[family] = TokenBucket(settings.PAYSTACK_RATE_LIMITS[family])
+
+        return _buckets[family]
+
+
+def get_circuit_breaker(family):
+    """
+    Get the circuit breaker shared by the requests of an endpoint family in this process.
+    """
+    with _lock:
+        if family not in _breakers:
+            _breakers[family] = CircuitBreaker(settings.PAYSTACK_BREAKER_THRESHOLD,
+                                               settings.PAYSTACK_BREAKER_WINDOW,
+                                               settings.PAYSTACK_BREAKER_TIMEOUT)
+
+        return _breakers[family]
+
+
+def get_metrics():
+    """
+    Get the state of the token buckets and circuit breakers of this process.
+
+    :return: Dict mapping each endpoint family to its metrics.
+    """
+    with _lock:
+        families = sorted(set(_buckets) | set(_breakers))
+
+    return {family: {**get_token_bucket(family).get_metrics(), **get_circuit_breaker(family).get_metrics()}
+            for family in families}
+
+
+def reset():
+    """
+    Drop the token buckets and circuit breakers, e.g. after the settings changed.
+    """
+    with _lock:
+        _buckets.clear()
+        _breakers.clear()
@@ -1,50 +1,239 @@
+import asyncio
 import json
+import os
+import threading
+import time
+import weakref
 
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from django.conf import settings
+from rest_framework.exceptions import APIException
 
 from esusu.settings import env
 
+from . import throttling
+
+
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+
+# The endpoint families requests are rate limited by, matched by path prefix in order.
+ENDPOINT_FAMILIES = [
+    ('/transaction/charge_authorization', 'charge'),
+    ('/bulkcharge', 'charge'),
+    ('/transaction/verify', 'verify'),
+    ('/transfer/verify', 'verify'),
+    ('/bank/resolve', 'verify'),
+    ('/transfer', 'transfer'),
+]
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+_async_clients = weakref.WeakKeyDictionary()
+
+
+class PaystackError(APIException):
+    """
+    Raised when Paystack cannot handle a request, i.e. it is rate limited or has a server error.
+    API requests that raise it are answered with 503 Service Unavailable.
+    """
+    status_code = 503
+    default_detail = 'Paystack is unavailable, try again later.'
+    default_code = 'paystack_unavailable'
+
+    def __init__(self, message, paystack_status_code=None):
+        super().__init__(message)
+        self.paystack_status_code = paystack_status_code
+
+
+class PaystackUnavailable(PaystackError):
+    """
+    Raised without making a request while the circuit of an endpoint family is open.
+    """
+
+
+def get_endpoint_family(path):
+    """
+    Get the endpoint family of a Paystack API path.
+    """
+    for prefix, family in ENDPOINT_FAMILIES:
+        if path.startswith(prefix):
+            return family
+
+    return 'other'
+
+
+def get_session():
+    """
+    Get the HTTP session shared by the Paystack clients of the current process.
+
+    The session keeps up to `PAYSTACK_POOL_SIZE` connections alive, so requests do not pay
+    for a new TCP and TLS handshake every time. Requests that fail to connect, and GET requests
+    that fail with a server error, are retried with backoff.
+
+    :return: A `requests.Session` instance.
+    """
+    global _session, _session_pid
+
+    with _session_lock:
+        # Connections cannot be shared with forked processes.
+        if _session is None or _session_pid != os.getpid():
+            retry = Retry(total=settings.PAYSTACK_RETRIES, backoff_factor=settings.PAYSTACK_RETRY_BACKOFF,
+                          status_forcelist=RETRY_STATUS_CODES, allowed_methods=['GET'],
+                          raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.PAYSTACK_POOL_SIZE,
+                                  max_retries=retry)
+
+            _session = requests.Session()
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+            _session_pid = os.getpid()
+
+    return _session
+
+
+def get_async_client():
+    """
+    Get the HTTP client shared by the async Paystack clients of the running event loop.
+
+    The client keeps up to `PAYSTACK_ASYNC_POOL_SIZE` connections open, so thousands of requests
+    can be in flight in a single process. Requests that fail to connect are retried.
+
+    :return: An `httpx.AsyncClient` instance.
+    """
+    # Connections cannot be shared between event loops.
+    loop = asyncio.get_running_loop()
+
+    if loop not in _async_clients:
+        limits = httpx.Limits(max_connections=settings.PAYSTACK_ASYNC_POOL_SIZE,
+                              max_keepalive_connections=settings.PAYSTACK_ASYNC_POOL_SIZE)
+        transport = httpx.AsyncHTTPTransport(limits=limits, retries=settings.PAYSTACK_RETRIES)
+        _async_clients[loop] = httpx.AsyncClient(transport=transport)
+
+    return _async_clients[loop]
+
+
+async def close_async_client():
+    """
+    Close the HTTP client of the running event loop, e.g. before the loop is closed.
+    """
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+
+    if client:
+        await client.aclose()
+
 
 class Paystack():
     secret_key = None
-    request = requests
+    base_url = None
+    request = None
+    timeout = None
     auth_header = {}
 
-    def __init__(self, secret_key=None):
+    def __init__(self, secret_key=None, base_url=None):
         self.secret_key = secret_key or env('PAYSTACK_SECRET_KEY')
+        self.base_url = base_url or settings.PAYSTACK_BASE_URL
+        self.request = get_session()
+        self.timeout = (settings.PAYSTACK_CONNECT_TIMEOUT, settings.PAYSTACK_READ_TIMEOUT)
         self.auth_header = {'Authorization': f'Bearer {self.secret_key}'}
 
+    def before_request(self, path):
+        """
+        Check the circuit of the endpoint family of a request and take a token for it.
+
+        :param path: The path of the endpoint.
+
+        :return: The number of seconds to wait before sending the request.
+        """
+        family = get_endpoint_family(path)
+
+        if not throttling.get_circuit_breaker(family).allow():
+            raise PaystackUnavailable(f'Paystack {family} requests are failing, try again later.')
+
+        return throttling.get_token_bucket(family).reserve()
+
+    def after_request(self, path, response=None):
+        """
+        Record the result of a request on the circuit of its endpoint family.
+        Rate limited requests also pause the requests of the family for the time Paystack asks.
+
+        :param path: The path of the endpoint.
+        :param response: The response, or None if no response was received.
+        """
+        family = get_endpoint_family(path)
+        breaker = throttling.get_circuit_breaker(family)
+
+        if response is not None and response.status_code < 500 and response.status_code != 429:
+            breaker.record_success()
+            return
+
+        breaker.record_failure()
+
+        if response is None:
+            return
+
+        if response.status_code == 429:
+            self.pause(path, response)
+
+        raise PaystackError(f'Paystack responded with status {response.status_code}.', response.status_code)
+
+    def pause(self, path, response):
+        """
+        Hold back the requests of the endpoint family of a rate limited request
+        for the number of seconds in its `Retry-After` header.
+        """
+        throttling.get_token_bucket(get_endpoint_family(path)).pause(
+            float(response.headers.get('Retry-After') or 1))
+
+    def send(self, method, path, **kwargs):
+        """
+        Send a request to the Paystack API.
+
+        :param method: The HTTP method.
+        :param path: The path of the endpoint.
+        :param kwargs: Arguments passed to the HTTP client, e.g. `params`, `data` or `json`.
+
+        :return: The decoded response content.
+        """
+        time.sleep(self.before_request(path))
+
+        try:
+            response = self.request.request(method, f'{self.base_url}{path}',
+                                            headers=self.auth_header, timeout=self.timeout, **kwargs)
+        except requests.RequestException:
+            self.after_request(path)
+            raise
+
+        self.after_request(path, response)
+
+        return json.loads(response.content)
+
     def verify_account_number(self, account_number, bank_code):
         """
         Verify account number is valid.
         https://paystack.com/docs/transfers/single-transfers#verify-the-account-number
         """
         params = {'account_number': account_number, 'bank_code': bank_code}
-        response = self.request.get('https://api.paystack.co/bank/resolve',
-                                    params=params,
-                                    headers=self.auth_header)
 
-        return json.loads(response.content)
+        return self.send('GET', '/bank/resolve', params=params)
 
     def create_transfer_recipient(self, **kwargs):
         """
         Create a transfer recipient.
         https://paystack.com/docs/transfers/single-transfers#create-a-transfer-recipient
         """
-        response = self.request.post(
-            'https://api.paystack.co/transferrecipient', data=kwargs, headers=self.auth_header)
-
-        return json.loads(response.content)
+        return self.send('POST', '/transferrecipient', data=kwargs)
 
     def verify_transaction(self, reference):
         """
         Confirm the status of a transaction.
         https://paystack.com/docs/api/#transaction-verify
         """
-        response = self.request.get(
-            f'https://api.paystack.co/transaction/verify/{reference}', headers=self.auth_header)
-
-        return json.loads(response.content)
+        return self.send('GET', f'/transaction/verify/{reference}')
 
     def create_refund(self, reference):
         """
@@ -53,12 +242,9 @@ class Paystack():
         """
         data = {'transaction': reference}
 
-        response = self.request.post(
-            'https://api.paystack.co/refund', data=data, headers=self.auth_header)
-
-        return json.loads(response.content)
+        return self.send('POST', '/refund', data=data)
 
-    def charge_authorization(self, authorization_code, email, amount):
+    def charge_authorization(self, authorization_code, email, amount, reference=None):
         """
         Charge authorization.
         https://paystack.com/docs/payments/recurring-charges/#charge-the-authorization
@@ -66,10 +252,18 @@ class Paystack():
         data = {'authorization_code': authorization_code,
                 'email': email, 'amount': amount*10}
 
-        response = self.request.post(
-            'https://api.paystack.co/transaction/charge_authorization', data=data, headers=self.auth_header)
+        if reference:
+            data['reference'] = reference
 
-        return json.loads(response.content)
+        return self.send('POST', '/transaction/charge_authorization', data=data)
+
+    def bulk_charge(self, charges):
+        """
+        Charge multiple authorizations at once with Paystack bulk charge feature.
+        The result of each charge is sent to the webhook.
+        https://paystack.com/docs/payments/bulk-charges/
+        """
+        return self.send('POST', '/bulkcharge', json=charges)
 
     def bulk_transfers(self, transfers):
         """
@@ -78,12 +272,16 @@ class Paystack():
         """
         data = {'currency': 'NGN', 'source': 'balance', 'transfers': transfers}
 
-        response = self.request.post(
-            'https://api.paystack.co/transfer/bulk', data=data, headers=self.auth_header)
+        return self.send('POST', '/transfer/bulk', json=data)
 
-        return json.loads(response.content)
+    def verify_transfer(self, reference):
+        """
+        Confirm the status of a transfer.
+        https://paystack.com/docs/api/#transfer-verify
+        """
+        return self.send('GET', f'/transfer/verify/{reference}')
 
-    def initiate_transfer(self, recipient, amount):
+    def initiate_transfer(self, recipient, amount, reference=None):
         """
         Initiate a funds transfer.
         https://paystack.com/docs/transfers/single-transfers#initiate-a-transfer
@@ -91,7 +289,60 @@ class Paystack():
         data = {'currency': 'NGN', 'source': 'balance',
                 'recipient': recipient, 'amount': amount}
 
-        response = self.request.post(
-            'https://api.paystack.co/transfer', data=data, headers=self.auth_header)
+        if reference:
+            data['reference'] = reference
+
+        return self.send('POST', '/transfer', data=data)
+
+
+class AsyncPaystack(Paystack):
+    """
+    A Paystack client for asyncio code, with the same methods as `Paystack`.
+    Every method returns a coroutine, e.g. `await AsyncPaystack().verify_transaction(reference)`.
+    """
+
+    def __init__(self, secret_key=None, base_url=None):
+        super().__init__(secret_key, base_url)
+        # The client of the running event loop is looked up for each request.
+        self.request = None
+        self.timeout = httpx.Timeout(settings.PAYSTACK_READ_TIMEOUT,
+                                     connect=settings.PAYSTACK_CONNECT_TIMEOUT)
+
+    async def send(self, method, path, **kwargs):
+        """
+        Send a request to the Paystack API.
+        GET requests that fail with a server error are retried with backoff, and rate limited
+        GET requests are retried after the time in their `Retry-After` header.
+
+        :param method: The HTTP method.
+        :param path: The path of the endpoint.
+        :param kwargs: Arguments passed to the HTTP client, e.g. `params`, `data` or `json`.
+
+        :return: The decoded response content.
+        """
+        response = None
+
+        for retry in range(settings.PAYSTACK_RETRIES + 1):
+            if response is not None and response.status_code == 429:
+                # The next token is only available once the time Paystack asks for has passed.
+                self.pause(path, response)
+            elif retry:
+                await asyncio.sleep(settings.PAYSTACK_RETRY_BACKOFF * 2 ** (retry - 1))
+
+            # Every attempt takes a token, like the requests of the other clients.
+            await asyncio.sleep(self.before_request(path))
+
+            try:
+                response = await get_async_client().request(method, f'{self.base_url}{path}',
+                                                            headers=self.auth_header, timeout=self.timeout,
+                                                            **kwargs)
+            except httpx.HTTPError:
+                self.after_request(path)
+                raise
+
+            if method != 'GET' or response.status_code not in RETRY_STATUS_CODES:
+                break
+
+        self.after_request(path, response)
 
         return json.loads(response.content)
@@ -1,26 +1,27 @@
-from decimal import Decimal
-from datetime import datetime, timedelta
+from datetime import datetime
 
+from django.db import transaction
 from django.utils.translation import gettext_lazy as _
 
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet, ViewSet
 from rest_framework.permissions import IsAuthenticated
 
 
 from base.permissions import IsOwner
-from base.mixins import SuccessMessageMixin
-from groups.models import Cycle, Membership
+from base.mixins import FieldsetMixin, KeysetPaginationMixin, QueryPlanningMixin, SuccessMessageMixin
 
 from .utils import Paystack
-from .models import Bank, Card, PaymentList, SavingsList, Transaction
-from .serializers import BankSerializer, CardSerializer, VerifyPaymentSerializer, WebhookSerializer
+from . import services
+from .models import Bank, Card, Run, WebhookEvent
+from .serializers import BankSerializer, CardSerializer, RunSerializer, VerifyPaymentSerializer, WebhookSerializer
 
 
-class BankViewset(SuccessMessageMixin, ModelViewSet):
+class BankViewset(SuccessMessageMixin, FieldsetMixin, KeysetPaginationMixin, QueryPlanningMixin, ModelViewSet):
     queryset = Bank.objects.all()
     serializer_class = BankSerializer
     permission_classes = (IsAuthenticated, IsOwner)
@@ -37,7 +38,7 @@ class BankViewset(SuccessMessageMixin, ModelViewSet):
         serializer.save(user=self.request.user)
 
 
-class CardViewSet(SuccessMessageMixin, ModelViewSet):
+class CardViewSet(SuccessMessageMixin, FieldsetMixin, KeysetPaginationMixin, QueryPlanningMixin, ModelViewSet):
     queryset = Card.objects.all()
     serializer_class = CardSerializer
     permission_classes = (IsAuthenticated, IsOwner,)
@@ -68,7 +69,9 @@ class CardViewSet(SuccessMessageMixin, ModelViewSet):
             data={**response_data['authorization'], 'reference': reference})
         serializer.is_valid(raise_exception=True)
 
-        serializer.save(user=request.user)
+        # The refund of the card is queued in the outbox when it is saved. See `card_post_save`.
+        with transaction.atomic():
+            serializer.save(user=request.user)
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -78,121 +81,39 @@ class TransactionViewset(SuccessMessageMixin, ViewSet):
 
     @action(methods=['GET'], detail=False)
     def save(self, request, **kwargs):
-        # Fetch all the cycles that has their next saving date as today.
-        cycles = Cycle.objects.select_related('group').filter(
-            next_saving_date=datetime.now().date())
+        run = services.enqueue_run(Run.SAVINGS, datetime.now().date())
+        serializer = RunSerializer(run)
 
-        for cycle in cycles:
-            memberships = Membership.objects.filter(group=cycle.group)
+        self.success_message = _('Savings operation queued successfully.')
 
-            for membership in memberships:
-                card = Card.objects.select_related(
-                    'user').filter(user=membership.user).first()
-
-                # Convert amount to save to the integer value.
-                amount_to_save = int(
-                    Decimal(cycle.group.amount_to_save.amount)) * 10
-
-                # Charge card
-                paystack = Paystack()
-                response = paystack.charge_authorization(
-                    card.authorization_code, card.user.email, amount_to_save)
-
-                response_data = response['data']
-
-                amount = response_data['amount'] / 100
-                reference = response_data['reference']
-                type = 'savings'
-                transaction_status = response_data['status']
-
-                # Save transaction.
-                transaction = Transaction.objects.create(
-                    amount=amount, reference=reference, type=type, status=transaction_status, user=card.user)
-
-                # Save the transaction in savings list.
-                SavingsList.objects.create(
-                    cycle=cycle, group=cycle.group, transaction=transaction, user=card.user)
-
-        # Update next saving date.
-        if len(cycles) > 0 and cycles[0].end_date == datetime.now().date():
-            next_saving_date = None
-        else:
-            next_saving_date = datetime.now().date() + \
-                timedelta(days=7)
-
-        cycles.update(next_saving_date=next_saving_date)
-
-        self.success_message = _('Savings operation completed successfully.')
-
-        return Response(status=status.HTTP_200_OK)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
 
     @action(methods=['GET'], detail=False)
     def pay(self, request, **kwargs):
-        # Fetch all users that has their payment date as today.
-        payments = PaymentList.objects.select_related('group').filter(
-            payment_date=datetime.now().date())
+        run = services.enqueue_run(Run.PAYMENT, datetime.now().date())
+        serializer = RunSerializer(run)
 
-        for payment in payments:
+        self.success_message = _('Payment operation queued successfully.')
 
-            # If the transaction field on the payment exist,
-            # skip the iteration because a payment has already been attempted.
-            if payment.transaction:
-                continue
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
 
-            try:
-                bank = Bank.objects.get(user=payment.user)
+    @action(methods=['GET'], detail=False, url_path='runs/(?P<run_id>[^/.]+)')
+    def run(self, request, run_id=None):
+        self.resource_name = 'Run'
 
-                # Calculate amount to pay.
-                # Amount to pay is the amount saved multiplied by the number of group members.
-                membership_count = Membership.objects.filter(
-                    group=payment.group).count()
-                amount_to_pay = int(
-                    Decimal(payment.group.amount_to_save.amount)) * membership_count * 100
+        run = get_object_or_404(Run, id=run_id)
+        serializer = RunSerializer(run)
 
-                # Initiate transfer.
-                paystack = Paystack()
-                response = paystack.initiate_transfer(
-                    bank.transfer_recipient, amount_to_pay)
-
-                # If the paystack request was not successful for any reason,
-                # skip to the next iteration.
-                # @TODO: Log failed transfers and reason for failure.
-                if not response['status']:
-                    continue
-
-                response_data = response['data']
-
-                amount = response_data['amount'] / 100
-                reference = response_data['reference']
-                type = 'payment'
-                transaction_status = response_data['status']
-
-                # Save transaction.
-                transaction = Transaction.objects.create(
-                    amount=amount, reference=reference, type=type, status=transaction_status, user=bank.user)
-
-                # Update payment list with transaction.
-                payment.transaction = transaction
-                payment.save()
-            except Bank.DoesNotExist:
-                pass
-
-        self.success_message = _('Payment operation completed successfully.')
-
-        return Response(status=status.HTTP_200_OK)
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(methods=['POST'], detail=False)
     def webhook(self, request, **kwargs):
         serializer = WebhookSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        reference = serializer.data['data']['reference']
-        transaction_status = serializer.data['data']['status']
-
-        transaction = Transaction.objects.filter(reference=reference).first()
-
-        if transaction:
-            transaction.status = transaction_status
-            transaction.save()
+        # Events are applied in batches by the webhook consumer, so the webhook responds right away.
+        WebhookEvent.objects.create(event=serializer.data['event'],
+                                    reference=serializer.data['data']['reference'],
+                                    data=serializer.data['data'])
 
         return Response(status=status.HTTP_200_OK)
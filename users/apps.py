@@ -1,6 +1,17 @@
-from django.apps import AppConfig
+from django.apps import AppConfig, apps
+from django.db.models import signals
+
+from . import signals as handlers
 
 
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        signals.post_save.connect(handlers.user_post_save,
+                                  sender=apps.get_model('users', 'User'),
+                                  dispatch_uid='user_post_save')
+        signals.post_delete.connect(handlers.user_post_delete,
+                                    sender=apps.get_model('users', 'User'),
+                                    dispatch_uid='user_post_delete')
@@ -1,10 +1,12 @@
 from django.db import models
 from rest_framework import serializers
 
+from base.serializers import FieldsetMixin
+
 from .models import User
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(FieldsetMixin, serializers.ModelSerializer):
     full_name = serializers.SerializerMethodField()
 
     class Meta:
@@ -14,3 +16,6 @@ class UserSerializer(serializers.ModelSerializer):
 
     def get_full_name(self, obj):
         return obj.get_full_name() if obj else ''
+
+    def get_full_name_from_values(self, values):
+        return f"{values['first_name']} {values['last_name']}"
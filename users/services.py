@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import User
+
+
+def get_user_cache_key(user_id):
+    return f'users:user:{user_id}'
+
+
+def get_cached_user(user_id):
+    """
+    Get a user from the shared cache, loading it from the database if it is not cached.
+
+    The password is not cached. It is loaded from the database if it is accessed,
+    and saving a cached user does not overwrite it.
+
+    :param user_id: The id of the user.
+
+    :return: The `User`, or None if there is no user with the id.
+    """
+    key = get_user_cache_key(user_id)
+    values = cache.get(key)
+
+    if values is None:
+        fields = [field.attname for field in User._meta.concrete_fields if field.name != 'password']
+        values = User.objects.filter(pk=user_id).values(*fields).first()
+
+        if values is None:
+            return None
+
+        cache.set(key, values, settings.USER_CACHE_TIMEOUT)
+
+    return User.from_db(User.objects.db, list(values), list(values.values()))
+
+
+def clear_cached_user(user_id):
+    cache.delete(get_user_cache_key(user_id))
@@ -0,0 +1,14 @@
+def user_post_save(sender, instance, **kwargs):
+    """
+    Remove the user from the cache, so the next request loads the saved user.
+    """
+    # Services import the models, which are not ready when this module is imported.
+    from .services import clear_cached_user
+
+    clear_cached_user(instance.pk)
+
+
+def user_post_delete(sender, instance, **kwargs):
+    from .services import clear_cached_user
+
+    clear_cached_user(instance.pk)